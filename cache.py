@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Short-TTL response cache for idempotent GET probes (/health, /docs)
+Backed by a small JSON file so consecutive script runs reuse each other's results
+"""
+
+import json
+import os
+import time
+
+CACHE_FILE = os.path.expanduser("~/.neuroscan_cache.json")
+DEFAULT_TTL = 5
+
+# url -> [expiry_epoch, status, text]
+_entries = None
+
+def _load():
+    """Load the on-disk cache once per process"""
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_FILE, "r") as f:
+                _entries = json.load(f)
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+def _save():
+    """Persist the cache for the next script run"""
+    try:
+        with open(CACHE_FILE, "w") as f:
+            json.dump(_entries, f)
+    except OSError:
+        pass
+
+def lookup(url):
+    """Return a fresh (status, text) for url, or None"""
+    entry = _load().get(url)
+    if entry and time.time() < entry[0]:
+        return entry[1], entry[2]
+    return None
+
+def store(url, status, text, ttl=DEFAULT_TTL):
+    """Remember a response for ttl seconds"""
+    _load()[url] = [time.time() + ttl, status, text]
+    _save()
+
+def cached_get(session, url, ttl=DEFAULT_TTL, timeout=10, allow_stale=True):
+    """GET url through session, serving a fresh cached result when there is one
+
+    On a network error the last (stale) entry is returned when allow_stale is set.
+    """
+    hit = lookup(url)
+    if hit is not None:
+        return hit
+
+    try:
+        response = session.get(url, timeout=timeout)
+    except Exception:
+        entry = _load().get(url)
+        if allow_stale and entry:
+            print(f"⚠️ {url} unreachable, using cached status {entry[1]}")
+            return entry[1], entry[2]
+        raise
+
+    # Only successful responses are cached, so pollers see recovery right away
+    if response.ok:
+        store(url, response.status_code, response.text, ttl)
+    return response.status_code, response.text
+
+# Admin tokens, keyed by login URL, so repeated script runs skip the
+# (deliberately slow) server-side password check while the token is valid
+TOKEN_FILE = os.path.expanduser("~/.neuroscan_admin_token.json")
+TOKEN_TTL = 1700
+
+def _load_tokens():
+    try:
+        with open(TOKEN_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_tokens(tokens):
+    try:
+        fd = os.open(TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(tokens, f)
+    except OSError:
+        pass
+
+def load_admin_token(login_url):
+    """Return a cached admin token that is valid for at least another minute"""
+    entry = _load_tokens().get(login_url)
+    if entry and entry["exp"] > time.time() + 60:
+        return entry["token"]
+    return None
+
+def save_admin_token(login_url, token, ttl=TOKEN_TTL):
+    """Cache an admin token (file is created with 0600 permissions)"""
+    tokens = _load_tokens()
+    tokens[login_url] = {"token": token, "exp": time.time() + ttl}
+    _save_tokens(tokens)
+
+def clear_admin_token(login_url):
+    """Forget a cached admin token, e.g. after the API rejected it"""
+    tokens = _load_tokens()
+    if tokens.pop(login_url, None) is not None:
+        _save_tokens(tokens)
+
+# Last endpoint that worked for each kind of probe (e.g. which registration
+# route this API exposes), so reruns try it first instead of every candidate.
+# Endpoints that answered 404 are kept under "_missing" and skipped for a day
+ENDPOINT_FILE = os.path.expanduser("~/.neuroscan_endpoints.json")
+MISSING_TTL = 24 * 3600
+
+def _load_endpoints():
+    try:
+        with open(ENDPOINT_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_endpoints(endpoints):
+    try:
+        with open(ENDPOINT_FILE, "w") as f:
+            json.dump(endpoints, f)
+    except OSError:
+        pass
+
+def last_endpoint(kind):
+    """Return the endpoint that last worked for kind, or None"""
+    return _load_endpoints().get(kind)
+
+def remember_endpoint(kind, endpoint):
+    """Record the endpoint that worked for kind"""
+    endpoints = _load_endpoints()
+    missing = endpoints.get("_missing", {}).get(kind, {})
+    if endpoints.get(kind) == endpoint and endpoint not in missing:
+        return
+    endpoints[kind] = endpoint
+    missing.pop(endpoint, None)
+    _save_endpoints(endpoints)
+
+def remember_missing(kind, endpoint):
+    """Record that endpoint answered 404 for kind, so it is skipped for MISSING_TTL"""
+    endpoints = _load_endpoints()
+    endpoints.setdefault("_missing", {}).setdefault(kind, {})[endpoint] = time.time()
+    if endpoints.get(kind) == endpoint:
+        del endpoints[kind]
+    _save_endpoints(endpoints)
+
+def ordered_endpoints(kind, candidates):
+    """Candidates for kind with the last working one first and recent 404s left out"""
+    endpoints = _load_endpoints()
+    now = time.time()
+    missing = {
+        endpoint for endpoint, ts in endpoints.get("_missing", {}).get(kind, {}).items()
+        if now - ts < MISSING_TTL
+    }
+    ordered = [endpoint for endpoint in candidates if endpoint not in missing]
+    last = endpoints.get(kind)
+    if last in ordered:
+        ordered.remove(last)
+        ordered.insert(0, last)
+    return ordered
@@ -8,9 +8,34 @@ import requests
 import json
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import neuro_http
+
+# Advertise Brotli only when it can actually be decoded
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
 
 API_BASE = "https://neuroscan-api.onrender.com"
 
+# Timestamp of this migration run, computed once
+RUN_TS_STR = time.strftime('%Y-%m-%d %H:%M:%S')
+
+# Pre-serialized request bodies (encoded once instead of on every call)
+JSON_HEADERS = {"Content-Type": "application/json"}
+ADMIN_LOGIN_BODY = json.dumps({"username": "admin", "password": "admin123"})
+
+# Shared API session with JSON-only negotiation headers
+SESSION = requests.Session()
+SESSION.headers.update({
+    "Accept": "application/json",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "User-Agent": "neuroscan-ci/1.0",
+})
+
 def create_migration_endpoint():
     """Create a temporary migration script that can be executed via the API"""
     print("🔧 CREATING DATABASE MIGRATION VIA API")
@@ -19,66 +44,35 @@ def create_migration_endpoint():
     # SQL to add missing customer authentication fields
     migration_sql = """
     -- Add customer authentication fields if they don't exist
-    DO $$
-    BEGIN
-        -- Add username column if it doesn't exist
-        IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
-            WHERE table_name = 'customers' AND column_name = 'username'
-        ) THEN
-            ALTER TABLE customers ADD COLUMN username VARCHAR UNIQUE;
-            CREATE INDEX IF NOT EXISTS idx_customers_username ON customers(username);
-        END IF;
-        
-        -- Add hashed_password column if it doesn't exist
-        IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
-            WHERE table_name = 'customers' AND column_name = 'hashed_password'
-        ) THEN
-            ALTER TABLE customers ADD COLUMN hashed_password VARCHAR;
-        END IF;
-        
-        -- Add is_active column if it doesn't exist
-        IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
-            WHERE table_name = 'customers' AND column_name = 'is_active'
-        ) THEN
-            ALTER TABLE customers ADD COLUMN is_active BOOLEAN DEFAULT TRUE;
-            CREATE INDEX IF NOT EXISTS idx_customers_is_active ON customers(is_active);
-        END IF;
-        
-        -- Add last_login column if it doesn't exist
-        IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
-            WHERE table_name = 'customers' AND column_name = 'last_login'
-        ) THEN
-            ALTER TABLE customers ADD COLUMN last_login TIMESTAMP WITH TIME ZONE;
-        END IF;
-        
-        -- Add created_at column if it doesn't exist
-        IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
-            WHERE table_name = 'customers' AND column_name = 'created_at'
-        ) THEN
-            ALTER TABLE customers ADD COLUMN created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
-        END IF;
-        
-        -- Add updated_at column if it doesn't exist
-        IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
-            WHERE table_name = 'customers' AND column_name = 'updated_at'
-        ) THEN
-            ALTER TABLE customers ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE;
-        END IF;
-        
-    END $$;
+    BEGIN;
+
+    ALTER TABLE customers
+        ADD COLUMN IF NOT EXISTS username VARCHAR,
+        ADD COLUMN IF NOT EXISTS hashed_password VARCHAR,
+        ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE,
+        ADD COLUMN IF NOT EXISTS last_login TIMESTAMP WITH TIME ZONE,
+        ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_username ON customers(username);
+    CREATE INDEX IF NOT EXISTS idx_customers_is_active ON customers(is_active);
+
+    COMMIT;
     """
     
-    # Save the SQL to a file for reference
-    with open("customer_auth_migration.sql", "w") as f:
-        f.write(migration_sql)
-    
-    print("✅ Migration SQL created: customer_auth_migration.sql")
+    # Save the SQL to a file for reference (skip the write if nothing changed)
+    migration_file = "customer_auth_migration.sql"
+    existing_sql = None
+    if os.path.exists(migration_file):
+        with open(migration_file, "r") as f:
+            existing_sql = f.read()
+
+    if existing_sql != migration_sql:
+        with open(migration_file, "w") as f:
+            f.write(migration_sql)
+        print(f"✅ Migration SQL created: {migration_file}")
+    else:
+        print(f"✅ Migration SQL unchanged: {migration_file}")
     return migration_sql
 
 def try_direct_database_access():
@@ -88,9 +82,10 @@ def try_direct_database_access():
     
     # Try to get admin token first
     try:
-        admin_response = requests.post(
+        admin_response = SESSION.post(
             f"{API_BASE}/auth/login",
-            json={"username": "admin", "password": "admin123"},
+            data=ADMIN_LOGIN_BODY,
+            headers=JSON_HEADERS,
             timeout=15
         )
         
@@ -101,11 +96,16 @@ def try_direct_database_access():
             # Try to access database info through admin endpoints
             print("📊 Checking database status via admin endpoints...")
             
-            dashboard_response = requests.get(
-                f"{API_BASE}/admin/dashboard",
-                headers=headers,
-                timeout=15
-            )
+            # Dashboard and customers only depend on the token, so fetch both at once
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                dashboard_future = executor.submit(
+                    SESSION.get, f"{API_BASE}/admin/dashboard", headers=headers, timeout=15
+                )
+                customers_future = executor.submit(
+                    SESSION.get, f"{API_BASE}/admin/customers", headers=headers, timeout=15
+                )
+                dashboard_response = dashboard_future.result()
+                customers_response = customers_future.result()
             
             print(f"Admin dashboard status: {dashboard_response.status_code}")
             
@@ -113,13 +113,7 @@ def try_direct_database_access():
                 dashboard_data = dashboard_response.json()
                 print(f"Dashboard data: {json.dumps(dashboard_data, indent=2)}")
                 
-                # Try to get customers to see the current schema
-                customers_response = requests.get(
-                    f"{API_BASE}/admin/customers",
-                    headers=headers,
-                    timeout=15
-                )
-                
+                # Use the customers listing to see the current schema
                 print(f"Customers endpoint status: {customers_response.status_code}")
                 
                 if customers_response.status_code == 200:
@@ -146,9 +140,10 @@ def create_customer_with_raw_sql():
     
     try:
         # Get admin token
-        admin_response = requests.post(
+        admin_response = SESSION.post(
             f"{API_BASE}/auth/login",
-            json={"username": "admin", "password": "admin123"},
+            data=ADMIN_LOGIN_BODY,
+            headers=JSON_HEADERS,
             timeout=15
         )
         
@@ -163,7 +158,7 @@ def create_customer_with_raw_sql():
             }
             
             print("🧪 Trying minimal customer creation...")
-            response = requests.post(
+            response = SESSION.post(
                 f"{API_BASE}/admin/customers",
                 json=minimal_customer,
                 headers=headers,
@@ -180,17 +175,14 @@ def create_customer_with_raw_sql():
                 # Now try to update it with authentication fields
                 print("🔧 Updating customer with auth fields...")
                 
-                # Hash password manually (using basic hash for now)
-                import hashlib
-                password_hash = hashlib.sha256("testpass123".encode()).hexdigest()
-                
+                # Send the plain password so the API hashes it with its own bcrypt context
                 update_data = {
                     "username": "testcustomer",
-                    "hashed_password": password_hash,
+                    "password": "testpass123",
                     "is_active": True
                 }
                 
-                update_response = requests.put(
+                update_response = SESSION.put(
                     f"{API_BASE}/admin/customers/{customer_id}",
                     json=update_data,
                     headers=headers,
@@ -218,50 +210,45 @@ def test_customer_login_after_fix():
     print("🧪 TESTING CUSTOMER LOGIN AFTER FIX")
     print("="*60)
     
-    test_credentials = [
-        {"username": "testcustomer", "password": "testpass123"},
-        {"username": "test@neuroscan.com", "password": "testpass123"},  # Try email as username
-    ]
+    creds = {"username": "testcustomer", "password": "testpass123"}
+    print(f"🔐 Testing login with: {creds['username']}")
     
-    for creds in test_credentials:
-        print(f"🔐 Testing login with: {creds['username']}")
+    try:
+        response = SESSION.post(
+            f"{API_BASE}/customer/login",
+            json=creds,
+            timeout=15
+        )
+        
+        print(f"   Status: {response.status_code}")
         
-        try:
-            response = requests.post(
-                f"{API_BASE}/customer/login",
-                json=creds,
+        if response.status_code == 200:
+            print("   ✅ LOGIN SUCCESSFUL!")
+            token_data = response.json()
+            
+            # Test customer dashboard
+            headers = {"Authorization": f"Bearer {token_data['access_token']}"}
+            dashboard_response = SESSION.get(
+                f"{API_BASE}/customer/dashboard",
+                headers=headers,
                 timeout=15
             )
             
-            print(f"   Status: {response.status_code}")
+            print(f"   Dashboard status: {dashboard_response.status_code}")
             
-            if response.status_code == 200:
-                print("   ✅ LOGIN SUCCESSFUL!")
-                token_data = response.json()
-                
-                # Test customer dashboard
-                headers = {"Authorization": f"Bearer {token_data['access_token']}"}
-                dashboard_response = requests.get(
-                    f"{API_BASE}/customer/dashboard",
-                    headers=headers,
-                    timeout=15
-                )
-                
-                print(f"   Dashboard status: {dashboard_response.status_code}")
-                
-                if dashboard_response.status_code == 200:
-                    print("   ✅ CUSTOMER PORTAL FULLY FUNCTIONAL!")
-                    return True
-                    
-            elif response.status_code == 401:
-                print("   ⚠️ Authentication failed (wrong credentials)")
-            elif response.status_code == 500:
-                print("   ❌ Server error (schema still broken)")
-            else:
-                print(f"   ❌ Unexpected error: {response.text}")
+            if dashboard_response.status_code == 200:
+                print("   ✅ CUSTOMER PORTAL FULLY FUNCTIONAL!")
+                return True
                 
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
+        elif response.status_code == 401:
+            print("   ⚠️ Authentication failed (wrong credentials)")
+        elif response.status_code == 500:
+            print("   ❌ Server error (schema still broken)")
+        else:
+            print(f"   ❌ Unexpected error: {response.text}")
+            
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
     
     return False
 
@@ -270,12 +257,16 @@ def main():
     print("🚀 CLOUD DATABASE SCHEMA MIGRATION")
     print("="*70)
     print(f"Target: {API_BASE}")
-    print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Time: {RUN_TS_STR}")
     print("="*70)
     
     # Step 1: Create migration SQL
     migration_sql = create_migration_endpoint()
     
+    # Wait for the API to be ready before attempting admin login
+    if not neuro_http.wait_ready(max_wait=15, require_db=True):
+        print("⚠️ API not reporting healthy yet, continuing anyway")
+    
     # Step 2: Try direct database access
     db_accessible = try_direct_database_access()
     
@@ -5,15 +5,97 @@ Complete deployment and verification of the customer portal
 """
 
 import requests
-import asyncio
 import json
-import time
+import sys
 from datetime import datetime
 
+import neuro_http
+
+# Advertise Brotli only when it can actually be decoded
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Timestamp of this test run, computed once
+RUN_TS = datetime.now()
+RUN_TS_STR = RUN_TS.strftime('%Y-%m-%d %H:%M:%S')
+
+# Separate sessions so API calls ask for JSON and frontend calls for HTML
+API_SESSION = requests.Session()
+API_SESSION.headers.update({
+    "Accept": "application/json",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "User-Agent": "neuroscan-ci/1.0",
+})
+
+FRONTEND_SESSION = requests.Session()
+FRONTEND_SESSION.headers.update({
+    "Accept": "text/html",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "User-Agent": "neuroscan-ci/1.0",
+})
+
+# Customer endpoint probes: (endpoint, method, payload)
+ENDPOINT_SPECS = (
+    ("/health", "GET", None),
+    ("/docs", "GET", None),
+    ("/customer/login", "POST", {"username": "test", "password": "test"}),
+    ("/customer/create", "POST", {
+        "name": "Test Customer",
+        "email": "test@neuroscan.com",
+        "username": "testuser",
+        "password": "testpass123"
+    }),
+)
+
+# ETags of previously fetched frontend pages, so unchanged pages come back as 304
+ETAG_CACHE_FILE = ".frontend_etags.json"
+
+def load_etags():
+    """Load cached frontend ETags keyed by URL"""
+    try:
+        with open(ETAG_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_etags(etags):
+    """Persist frontend ETags for the next run"""
+    try:
+        with open(ETAG_CACHE_FILE, "w") as f:
+            json.dump(etags, f)
+    except OSError:
+        pass
+
+# Frontend pages probed for accessibility
+FRONTEND_PAGES = (
+    "/",
+    "/customer/login",
+    "/customer/dashboard",
+    "/admin/login",
+)
+
 class CustomerPortalDeployment:
     def __init__(self):
         self.api_url = "https://neuroscan-api.onrender.com"
         self.frontend_url = "https://neuroscan-system.vercel.app"
+        
+        # Pre-build probe URLs and payloads once instead of on every request
+        self.endpoints = tuple(
+            (endpoint, self.api_url + endpoint, method, json.dumps(data) if data is not None else None)
+            for endpoint, method, data in ENDPOINT_SPECS
+        )
+        self.frontend_pages = tuple(
+            (page, self.frontend_url + page) for page in FRONTEND_PAGES
+        )
+    
+    def wait_ready(self, budget=15):
+        """Wait until the API health check reports a connected database"""
+        return neuro_http.wait_ready(max_wait=budget, require_db=True)
     
     def trigger_deployment_refresh(self):
         """Trigger a fresh deployment by hitting endpoints"""
@@ -21,15 +103,15 @@ class CustomerPortalDeployment:
         
         try:
             # Health check to warm up the service
-            response = requests.get(f"{self.api_url}/health", timeout=30)
+            response = API_SESSION.get(f"{self.api_url}/health", timeout=30)
             print(f"   API Health: {response.status_code}")
             
             # Test docs endpoint
-            response = requests.get(f"{self.api_url}/docs", timeout=30)
+            response = API_SESSION.get(f"{self.api_url}/docs", timeout=30)
             print(f"   API Docs: {response.status_code}")
             
             # Test frontend
-            response = requests.get(f"{self.frontend_url}/customer/login", timeout=30)
+            response = FRONTEND_SESSION.get(f"{self.frontend_url}/customer/login", timeout=30)
             print(f"   Frontend: {response.status_code}")
             
             print("✅ Deployment refresh completed")
@@ -44,26 +126,19 @@ class CustomerPortalDeployment:
         print("\n🧪 Testing Customer Portal Endpoints...")
         print("-" * 50)
         
-        endpoints = [
-            ("/health", "GET", None),
-            ("/docs", "GET", None),
-            ("/customer/login", "POST", {"username": "test", "password": "test"}),
-            ("/customer/create", "POST", {
-                "name": "Test Customer",
-                "email": "test@neuroscan.com", 
-                "username": "testuser",
-                "password": "testpass123"
-            }),
-        ]
-        
         results = {}
         
-        for endpoint, method, data in endpoints:
+        for endpoint, url, method, body in self.endpoints:
             try:
                 if method == "GET":
-                    response = requests.get(f"{self.api_url}{endpoint}", timeout=15)
+                    response = API_SESSION.get(url, timeout=15)
                 else:
-                    response = requests.post(f"{self.api_url}{endpoint}", json=data, timeout=15)
+                    response = API_SESSION.post(
+                        url,
+                        data=body,
+                        headers=JSON_HEADERS,
+                        timeout=15
+                    )
                 
                 status = "✅" if response.status_code < 500 else "❌"
                 results[endpoint] = {
@@ -88,26 +163,27 @@ class CustomerPortalDeployment:
         print("\n🌐 Testing Frontend Accessibility...")
         print("-" * 50)
         
-        pages = [
-            "/",
-            "/customer/login",
-            "/customer/dashboard",
-            "/admin/login",
-        ]
-        
         results = {}
+        etags = load_etags()
         
-        for page in pages:
+        for page, url in self.frontend_pages:
+            headers = {"If-None-Match": etags[url]} if url in etags else None
             try:
-                response = requests.get(f"{self.frontend_url}{page}", timeout=15)
-                status = "✅" if response.status_code == 200 else "❌"
-                results[page] = response.status_code == 200
-                print(f"   {status} {page}: {response.status_code}")
+                # Only the status matters, so close the stream without reading the body
+                with FRONTEND_SESSION.get(url, headers=headers, stream=True, timeout=15) as response:
+                    status_code = response.status_code
+                    if status_code == 200 and "ETag" in response.headers:
+                        etags[url] = response.headers["ETag"]
+                success = status_code in (200, 304)
+                status = "✅" if success else "❌"
+                results[page] = success
+                print(f"   {status} {page}: {status_code}")
                 
             except Exception as e:
                 print(f"   ❌ {page}: Error - {str(e)}")
                 results[page] = False
         
+        save_etags(etags)
         return results
     
     def run_comprehensive_test(self):
@@ -116,7 +192,7 @@ class CustomerPortalDeployment:
         print("=" * 60)
         print(f"Target API: {self.api_url}")
         print(f"Target Frontend: {self.frontend_url}")
-        print(f"Test Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Test Time: {RUN_TS_STR}")
         print("=" * 60)
         
         # 1. Trigger deployment refresh
@@ -124,7 +200,8 @@ class CustomerPortalDeployment:
         
         # 2. Wait for services to be ready
         print("\n⏳ Waiting for services to be ready...")
-        time.sleep(10)
+        if not self.wait_ready():
+            print("   ⚠️ API not reporting healthy yet, continuing anyway")
         
         # 3. Test API endpoints
         api_results = self.test_customer_endpoints()
@@ -153,7 +230,7 @@ class CustomerPortalDeployment:
         
         success_rate = self.calculate_success_rate(api_results, frontend_results)
         
-        print(f"📅 Deployment Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"📅 Deployment Date: {RUN_TS_STR}")
         print(f"📊 Overall Success Rate: {success_rate:.1f}%")
         
         if success_rate >= 90:
@@ -197,7 +274,7 @@ class CustomerPortalDeployment:
         
         # Save report to file
         report_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": RUN_TS.isoformat(),
             "success_rate": success_rate,
             "status": status,
             "api_results": api_results,
@@ -211,9 +288,15 @@ class CustomerPortalDeployment:
         }
         
         with open("final_deployment_report.json", "w") as f:
-            json.dump(report_data, f, indent=2)
+            json.dump(report_data, f, separators=(",", ":"), default=str)
         
         print(f"📄 Detailed report saved to: final_deployment_report.json")
+        
+        # Human-readable copy only when asked for
+        if "--pretty" in sys.argv:
+            with open("final_deployment_report.pretty.json", "w") as f:
+                json.dump(report_data, f, indent=2, default=str)
+            print(f"📄 Pretty report saved to: final_deployment_report.pretty.json")
 
 def main():
     """Main deployment test function"""
@@ -5,14 +5,27 @@ This script performs a comprehensive validation of the deployed Customer Portal
 to confirm all functionality is working correctly with the latest improvements.
 """
 
-import requests
+import asyncio
+import aiohttp
 import json
+import sys
 import time
 from datetime import datetime
 
+# Advertise Brotli only when it can actually be decoded
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
+
+# Timestamp of this validation run, computed once
+RUN_TS = datetime.now()
+RUN_TS_STR = RUN_TS.strftime('%Y-%m-%d %H:%M:%S')
+
 print("🚀 CUSTOMER PORTAL - FINAL DEPLOYMENT VALIDATION")
 print("=" * 55)
-print(f"📅 Validation Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+print(f"📅 Validation Time: {RUN_TS_STR}")
 print(f"🌐 Frontend URL: https://neuroscan-system.vercel.app")
 print(f"🔗 Customer Portal: https://neuroscan-system.vercel.app/customer/login")
 print(f"⚡ API Base URL: https://neuroscan-api.onrender.com")
@@ -27,105 +40,162 @@ TEST_CREDENTIALS = {
     "password": "password123"
 }
 
+# Protected customer endpoints, with full URLs built once
+PROTECTED_URLS = tuple(
+    (f"{API_BASE}{path}", name) for path, name in (
+        ("/customer/me", "Profile"),
+        ("/customer/dashboard", "Dashboard"),
+        ("/customer/products", "Products"),
+        ("/customer/certificates", "Certificates"),
+    )
+)
+CUSTOMER_LOGIN_API_URL = f"{API_BASE}/customer/login"
+HEALTH_URL = f"{API_BASE}/health"
+
+# Pre-serialized login body (encoded once instead of on every call)
+JSON_HEADERS = {"Content-Type": "application/json"}
+TEST_CREDENTIALS_BODY = json.dumps(TEST_CREDENTIALS)
+
+# API calls ask for JSON by default; frontend probes override Accept
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "User-Agent": "neuroscan-ci/1.0",
+}
+HTML_HEADERS = {"Accept": "text/html"}
+
+# Per-request timeouts
+SHORT_TIMEOUT = aiohttp.ClientTimeout(total=10)
+LONG_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+# ETags of previously fetched frontend pages, so unchanged pages come back as 304
+ETAG_CACHE_FILE = ".frontend_etags.json"
+
+def load_etags():
+    """Load cached frontend ETags keyed by URL"""
+    try:
+        with open(ETAG_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_etags(etags):
+    """Persist frontend ETags for the next run"""
+    try:
+        with open(ETAG_CACHE_FILE, "w") as f:
+            json.dump(etags, f)
+    except OSError:
+        pass
+
+frontend_etags = load_etags()
+
+async def get_frontend_status(session, url):
+    """Fetch a frontend page status, revalidating against the cached ETag"""
+    headers = dict(HTML_HEADERS)
+    if url in frontend_etags:
+        headers["If-None-Match"] = frontend_etags[url]
+    async with session.get(url, headers=headers, timeout=SHORT_TIMEOUT) as response:
+        if response.status == 200 and "ETag" in response.headers:
+            frontend_etags[url] = response.headers["ETag"]
+        return response.status
+
 # Results tracking
 test_results = {}
 total_tests = 0
 passed_tests = 0
 
-def run_test(test_name, test_function):
-    """Run a test and track results"""
-    global total_tests, passed_tests
-    total_tests += 1
-    
-    print(f"🧪 Testing: {test_name}")
+async def run_test(session, test_name, test_function):
+    """Run a test and return its outcome"""
     try:
-        result = test_function()
-        print(f"   ✅ PASS: {test_name}")
-        test_results[test_name] = {"status": "PASS", "details": str(result)[:100]}
-        passed_tests += 1
-        return True
+        result = await test_function(session)
+        return test_name, {"status": "PASS", "details": str(result)[:100]}
     except Exception as e:
-        print(f"   ❌ FAIL: {test_name} - {str(e)}")
-        test_results[test_name] = {"status": "FAIL", "error": str(e)}
-        return False
+        return test_name, {"status": "FAIL", "error": str(e)}
 
-def test_frontend_accessibility():
+async def test_frontend_accessibility(session):
     """Test that the frontend is accessible"""
-    response = requests.get(FRONTEND_URL, timeout=10)
-    assert response.status_code == 200
-    return f"Frontend accessible (Status: {response.status_code})"
+    status_code = await get_frontend_status(session, FRONTEND_URL)
+    assert status_code in (200, 304)
+    return f"Frontend accessible (Status: {status_code})"
 
-def test_customer_login_page():
+async def test_customer_login_page(session):
     """Test that the customer login page is accessible"""
-    response = requests.get(CUSTOMER_LOGIN_URL, timeout=10)
-    assert response.status_code == 200
-    return f"Customer login page accessible (Status: {response.status_code})"
+    status_code = await get_frontend_status(session, CUSTOMER_LOGIN_URL)
+    assert status_code in (200, 304)
+    return f"Customer login page accessible (Status: {status_code})"
 
-def test_api_health():
+async def test_api_health(session):
     """Test API health endpoint"""
-    response = requests.get(f"{API_BASE}/health", timeout=30)
-    assert response.status_code == 200
-    data = response.json()
+    async with session.get(HEALTH_URL, timeout=LONG_TIMEOUT) as response:
+        assert response.status == 200
+        data = await response.json()
     assert data["status"] == "healthy"
     assert data["database"] == "connected"
     return f"API healthy, DB connected ({data['database_type']})"
 
-def test_customer_authentication():
+async def test_customer_authentication(session):
     """Test customer login functionality"""
-    response = requests.post(
-        f"{API_BASE}/customer/login",
-        json=TEST_CREDENTIALS,
-        timeout=30
-    )
-    assert response.status_code == 200
-    data = response.json()
+    async with session.post(
+        CUSTOMER_LOGIN_API_URL,
+        data=TEST_CREDENTIALS_BODY,
+        headers=JSON_HEADERS,
+        timeout=LONG_TIMEOUT
+    ) as response:
+        assert response.status == 200
+        data = await response.json()
     assert "access_token" in data
     assert data["customer"]["username"] == "testcustomer"
     assert data["customer"]["name"] == "Test Customer"
     return f"Login successful, token received, customer: {data['customer']['name']}"
 
-def test_protected_customer_endpoints():
+async def test_protected_customer_endpoints(session):
     """Test protected customer endpoints with authentication"""
     # First get auth token
-    login_response = requests.post(f"{API_BASE}/customer/login", json=TEST_CREDENTIALS)
-    token = login_response.json()["access_token"]
+    async with session.post(
+        CUSTOMER_LOGIN_API_URL,
+        data=TEST_CREDENTIALS_BODY,
+        headers=JSON_HEADERS,
+        timeout=LONG_TIMEOUT
+    ) as login_response:
+        token = (await login_response.json())["access_token"]
     headers = {"Authorization": f"Bearer {token}"}
     
     # Test each protected endpoint
-    endpoints = [
-        ("/customer/me", "Profile"),
-        ("/customer/dashboard", "Dashboard"), 
-        ("/customer/products", "Products"),
-        ("/customer/certificates", "Certificates")
-    ]
+    async def check_endpoint(url, name):
+        async with session.get(url, headers=headers, timeout=SHORT_TIMEOUT) as response:
+            assert response.status == 200, f"{name} returned {response.status}"
+        return f"{name}: OK"
     
-    results = []
-    for endpoint, name in endpoints:
-        response = requests.get(f"{API_BASE}{endpoint}", headers=headers, timeout=10)
-        assert response.status_code == 200
-        results.append(f"{name}: OK")
+    results = await asyncio.gather(*(check_endpoint(url, name) for url, name in PROTECTED_URLS))
     
     return f"All endpoints working: {', '.join(results)}"
 
-def test_cors_configuration():
+async def test_cors_configuration(session):
     """Test CORS configuration for frontend"""
-    response = requests.options(f"{API_BASE}/customer/login")
-    headers = dict(response.headers)
-    assert "access-control-allow-origin" in headers
-    cors_origin = headers["access-control-allow-origin"]
+    async with session.options(CUSTOMER_LOGIN_API_URL, timeout=LONG_TIMEOUT) as response:
+        cors_origin = response.headers.get("access-control-allow-origin")
+    assert cors_origin is not None
     assert FRONTEND_URL in cors_origin or cors_origin == "*"
     return f"CORS properly configured for {cors_origin}"
 
-def test_error_handling_enhancement():
+async def test_error_handling_enhancement(session):
     """Test that the enhanced error handling is in place"""
     # This tests the frontend's ability to handle timeouts gracefully
     # We'll just verify the frontend is serving the enhanced login component
-    response = requests.get(CUSTOMER_LOGIN_URL, timeout=10)
-    assert response.status_code == 200
-    # Check if the response contains our enhanced error handling elements
-    content = response.text
+    async with session.get(CUSTOMER_LOGIN_URL, headers=HTML_HEADERS, timeout=SHORT_TIMEOUT) as response:
+        # The page itself is a client-side bundle, so a 200 is all that can be
+        # checked here; the body is never read
+        assert response.status == 200
     return "Enhanced login component deployed"
 
+async def run_all_tests(tests):
+    """Run all validation tests concurrently over one shared connection pool"""
+    connector = aiohttp.TCPConnector(limit=16, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS) as session:
+        return await asyncio.gather(
+            *(run_test(session, test_name, test_func) for test_name, test_func in tests)
+        )
+
 # Run all validation tests
 print("🔍 RUNNING VALIDATION TESTS")
 print("-" * 30)
@@ -140,8 +210,20 @@ tests = [
     ("Error Handling Enhancement", test_error_handling_enhancement),
 ]
 
-for test_name, test_func in tests:
-    run_test(test_name, test_func)
+# Results are reported in test order once every test has finished
+validation_run = asyncio.run(run_all_tests(tests))
+save_etags(frontend_etags)
+
+for test_name, result in validation_run:
+    total_tests += 1
+    test_results[test_name] = result
+    
+    print(f"🧪 Testing: {test_name}")
+    if result["status"] == "PASS":
+        print(f"   ✅ PASS: {test_name}")
+        passed_tests += 1
+    else:
+        print(f"   ❌ FAIL: {test_name} - {result['error']}")
     print()
 
 # Final results summary
@@ -180,7 +262,7 @@ print("\n🏁 VALIDATION COMPLETE")
 
 # Save results to file
 results_file = {
-    "validation_timestamp": datetime.now().isoformat(),
+    "validation_timestamp": RUN_TS.isoformat(),
     "frontend_url": FRONTEND_URL,
     "customer_portal_url": CUSTOMER_LOGIN_URL,
     "api_base_url": API_BASE,
@@ -194,6 +276,12 @@ results_file = {
 }
 
 with open("customer_portal_deployment_validation.json", "w") as f:
-    json.dump(results_file, f, indent=2)
+    json.dump(results_file, f, separators=(",", ":"), default=str)
 
 print(f"📄 Results saved to: customer_portal_deployment_validation.json")
+
+# Human-readable copy only when asked for
+if "--pretty" in sys.argv:
+    with open("customer_portal_deployment_validation.pretty.json", "w") as f:
+        json.dump(results_file, f, indent=2, default=str)
+    print(f"📄 Pretty results saved to: customer_portal_deployment_validation.pretty.json")
@@ -10,14 +10,45 @@ import os
 import sys
 import json
 from datetime import datetime
+import aiohttp
 import asyncpg
-import requests
 from typing import Optional, Dict, Any
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Authentication columns the customer portal needs
+REQUIRED_AUTH_FIELDS = ['username', 'hashed_password', 'is_active', 'last_login']
+
+# Placeholder bcrypt hash given to existing customers without a password
+DEFAULT_PASSWORD_HASH = '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewCfnJhCL2U8nu2u'
+
+# Above this many rows the default backfill goes through COPY instead of one UPDATE
+BULK_BACKFILL_THRESHOLD = 100_000
+
+# Read-only queries run on every check
+COLUMNS_QUERY = """
+SELECT column_name
+FROM information_schema.columns 
+WHERE table_name = 'customers';
+"""
+
+AUTH_COLUMNS_COUNT_QUERY = """
+SELECT COUNT(*)
+FROM information_schema.columns
+WHERE table_name = 'customers' AND column_name = ANY($1::text[]);
+"""
+
+VERIFY_QUERY = """
+SELECT 
+    COUNT(*) as total_customers,
+    COUNT(username) as with_username,
+    COUNT(hashed_password) as with_password,
+    COUNT(CASE WHEN is_active THEN 1 END) as active_customers
+FROM customers;
+"""
+
 class CustomerPortalMigration:
     def __init__(self):
         # Production API URL
@@ -25,75 +56,90 @@ class CustomerPortalMigration:
         
         # Database URL from Render environment
         self.db_url = os.getenv('DATABASE_URL')
-        if not self.db_url:
-            # Try to get from API environment info
-            self.db_url = self.get_db_url_from_api()
+        self.pool: Optional[asyncpg.Pool] = None
+        # Schema as seen right after the migration, reused by verification
+        self._post_schema: Optional[Dict[str, Any]] = None
+        # Rename duplicate usernames client-side with executemany instead of
+        # the default set-based UPDATE ... FROM
+        self.dedupe_executemany = os.getenv('NEUROSCAN_DEDUPE_EXECUTEMANY') == '1'
+        # Shared non-blocking HTTP session, opened by __aenter__
+        self._http: Optional[aiohttp.ClientSession] = None
+    
+    async def __aenter__(self) -> "CustomerPortalMigration":
+        self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        return self
     
-    def get_db_url_from_api(self) -> Optional[str]:
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._http.close()
+    
+    async def get_db_url_from_api(self) -> Optional[str]:
         """Attempt to get database URL from API environment"""
         try:
-            response = requests.get(f"{self.api_url}/health", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"API Health Check: {data}")
-                # Database URL is not exposed in health check for security
-                return None
+            async with self._http.get(f"{self.api_url}/health") as response:
+                if response.status == 200:
+                    data = await response.json()
+                    logger.info(f"API Health Check: {data}")
+                    # Database URL is not exposed in health check for security
+                    return None
         except Exception as e:
             logger.error(f"Failed to get API health: {e}")
             return None
     
-    async def connect_to_database(self) -> Optional[asyncpg.Connection]:
-        """Connect to the production database"""
+    async def _warm_api(self) -> None:
+        """Ping the API so a cold start overlaps with the database work"""
+        try:
+            async with self._http.get(
+                f"{self.api_url}/health",
+                timeout=aiohttp.ClientTimeout(total=60)
+            ):
+                pass
+        except Exception as e:
+            logger.warning(f"API warm-up ping failed: {e}")
+    
+    async def connect_to_database(self) -> Optional[asyncpg.Pool]:
+        """Create a connection pool to the production database"""
         if not self.db_url:
             logger.error("No database URL available")
             return None
         
         try:
-            conn = await asyncpg.connect(self.db_url)
+            self.pool = await asyncpg.create_pool(
+                self.db_url,
+                min_size=5,
+                max_size=20,
+                max_inactive_connection_lifetime=300,
+                command_timeout=60
+            )
             logger.info("Successfully connected to production database")
-            return conn
+            return self.pool
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             return None
     
-    async def check_customer_table_schema(self, conn: asyncpg.Connection) -> Dict[str, Any]:
+    async def auth_fields_present(self) -> bool:
+        """Cheap check whether every authentication column already exists"""
+        try:
+            async with self.pool.acquire() as conn:
+                count = await conn.fetchval(AUTH_COLUMNS_COUNT_QUERY, REQUIRED_AUTH_FIELDS)
+            return count == len(REQUIRED_AUTH_FIELDS)
+        except Exception as e:
+            logger.error(f"Failed to check authentication columns: {e}")
+            return False
+    
+    async def check_customer_table_schema(self) -> Dict[str, Any]:
         """Check the current customer table schema"""
         try:
-            # Get table columns
-            columns_query = """
-            SELECT column_name, data_type, is_nullable, column_default
-            FROM information_schema.columns 
-            WHERE table_name = 'customers'
-            ORDER BY ordinal_position;
-            """
-            
-            columns = await conn.fetch(columns_query)
-            
-            # Get table constraints
-            constraints_query = """
-            SELECT constraint_name, constraint_type, column_name
-            FROM information_schema.table_constraints tc
-            JOIN information_schema.constraint_column_usage ccu ON tc.constraint_name = ccu.constraint_name
-            WHERE tc.table_name = 'customers';
-            """
-            
-            constraints = await conn.fetch(constraints_query)
+            async with self.pool.acquire() as conn:
+                columns = await conn.fetch(COLUMNS_QUERY)
             
+            # Check for required authentication fields
+            column_names = {col['column_name'] for col in columns}
             schema_info = {
-                'columns': [dict(col) for col in columns],
-                'constraints': [dict(const) for const in constraints],
-                'missing_auth_fields': []
+                'column_names': column_names,
+                'missing_auth_fields': [f for f in REQUIRED_AUTH_FIELDS if f not in column_names]
             }
             
-            # Check for required authentication fields
-            column_names = [col['column_name'] for col in columns]
-            required_auth_fields = ['username', 'hashed_password', 'is_active', 'last_login']
-            
-            for field in required_auth_fields:
-                if field not in column_names:
-                    schema_info['missing_auth_fields'].append(field)
-            
-            logger.info(f"Customer table schema: {len(schema_info['columns'])} columns")
+            logger.info(f"Customer table schema: {len(column_names)} columns")
             logger.info(f"Missing auth fields: {schema_info['missing_auth_fields']}")
             
             return schema_info
@@ -102,65 +148,145 @@ class CustomerPortalMigration:
             logger.error(f"Failed to check table schema: {e}")
             return {'error': str(e)}
     
-    async def migrate_customer_table(self, conn: asyncpg.Connection) -> bool:
+    async def migrate_customer_table(self) -> bool:
         """Apply database migration for customer authentication"""
         try:
-            # Migration SQL
-            migration_sql = """
-            -- Add customer authentication fields
-            ALTER TABLE customers 
-            ADD COLUMN IF NOT EXISTS username VARCHAR(100) UNIQUE;
-            
-            ALTER TABLE customers 
-            ADD COLUMN IF NOT EXISTS hashed_password VARCHAR(255);
-            
+            # Add customer authentication fields
+            add_columns_sql = """
             ALTER TABLE customers 
-            ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT true;
+                ADD COLUMN IF NOT EXISTS username VARCHAR(100),
+                ADD COLUMN IF NOT EXISTS hashed_password VARCHAR(255),
+                ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT true,
+                ADD COLUMN IF NOT EXISTS last_login TIMESTAMP;
+            """
             
-            ALTER TABLE customers 
-            ADD COLUMN IF NOT EXISTS last_login TIMESTAMP;
+            # Update existing customers with default authentication data
+            backfill_count_query = """
+            SELECT COUNT(*) FROM customers
+            WHERE username IS NULL OR hashed_password IS NULL;
+            """
             
-            -- Update existing customers with default authentication data
+            backfill_sql = """
             UPDATE customers 
             SET username = COALESCE(username, LOWER(REPLACE(name, ' ', ''))),
-                hashed_password = COALESCE(hashed_password, '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewCfnJhCL2U8nu2u'),
+                hashed_password = COALESCE(hashed_password, $1),
                 is_active = COALESCE(is_active, true)
             WHERE username IS NULL OR hashed_password IS NULL;
+            """
             
-            -- Ensure username uniqueness
-            UPDATE customers 
-            SET username = username || '_' || id::text 
-            WHERE id IN (
-                SELECT id FROM (
-                    SELECT id, ROW_NUMBER() OVER (PARTITION BY username ORDER BY id) as rn
-                    FROM customers
-                ) t WHERE rn > 1
-            );
+            # Ensure username uniqueness (only needed when duplicates exist).
+            # NULL usernames never conflict in a unique index, so they are left alone
+            dedupe_sql = """
+            UPDATE customers c
+            SET username = c.username || '_' || c.id::text
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY username ORDER BY id) as rn
+                FROM customers
+                WHERE username IS NOT NULL
+            ) t
+            WHERE t.id = c.id AND t.rn > 1;
+            """
+            
+            # Enforce username uniqueness without holding an exclusive lock
+            # (CONCURRENTLY cannot run inside a transaction block)
+            username_index_sql = """
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_username
+            ON customers(username);
             """
             
             # Execute migration
-            await conn.execute(migration_sql)
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(add_columns_sql)
+                    
+                    pending = await conn.fetchval(backfill_count_query)
+                    if pending > BULK_BACKFILL_THRESHOLD:
+                        await self._backfill_defaults_bulk(conn)
+                    else:
+                        await conn.execute(backfill_sql, DEFAULT_PASSWORD_HASH)
+                
+                # Let the unique index detect duplicates; only de-duplicate when it fails
+                try:
+                    await conn.execute(username_index_sql)
+                except asyncpg.UniqueViolationError:
+                    logger.info("Duplicate usernames found, de-duplicating...")
+                    # A failed concurrent build leaves an invalid index behind
+                    await conn.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_customers_username;")
+                    if self.dedupe_executemany:
+                        await self._dedupe_via_executemany(conn)
+                    else:
+                        await conn.execute(dedupe_sql)
+                    await conn.execute(username_index_sql)
             logger.info("✅ Database migration completed successfully")
+            
+            self._post_schema = await self.check_customer_table_schema()
             return True
             
         except Exception as e:
             logger.error(f"❌ Migration failed: {e}")
             return False
     
-    async def verify_migration(self, conn: asyncpg.Connection) -> bool:
+    async def _backfill_defaults_bulk(self, conn: asyncpg.Connection) -> None:
+        """Backfill default auth data for large tables via COPY into a temp table"""
+        rows = await conn.fetch("""
+            SELECT id, name, username, hashed_password, is_active
+            FROM customers
+            WHERE username IS NULL OR hashed_password IS NULL;
+        """)
+        
+        records = [
+            (
+                row['id'],
+                row['username'] if row['username'] is not None
+                else (row['name'].replace(' ', '').lower() if row['name'] is not None else None),
+                row['hashed_password'] or DEFAULT_PASSWORD_HASH,
+                True if row['is_active'] is None else row['is_active'],
+            )
+            for row in rows
+        ]
+        
+        await conn.execute("""
+            CREATE TEMP TABLE customer_auth_backfill (
+                id INTEGER PRIMARY KEY,
+                username VARCHAR(100),
+                hashed_password VARCHAR(255),
+                is_active BOOLEAN
+            ) ON COMMIT DROP;
+        """)
+        await conn.copy_records_to_table('customer_auth_backfill', records=records)
+        await conn.execute("""
+            UPDATE customers c
+            SET username = b.username,
+                hashed_password = b.hashed_password,
+                is_active = b.is_active
+            FROM customer_auth_backfill b
+            WHERE c.id = b.id;
+        """)
+        logger.info(f"Backfilled {len(records)} customers via COPY")
+    
+    async def _dedupe_via_executemany(self, conn: asyncpg.Connection) -> None:
+        """Alternative to the set-based UPDATE: rename duplicates in one pipelined batch"""
+        duplicates = await conn.fetch("""
+            SELECT id, username FROM (
+                SELECT id, username, ROW_NUMBER() OVER (PARTITION BY username ORDER BY id) as rn
+                FROM customers
+                WHERE username IS NOT NULL
+            ) t WHERE rn > 1;
+        """)
+        
+        async with conn.transaction():
+            await conn.executemany(
+                "UPDATE customers SET username = $1 WHERE id = $2",
+                [(f"{row['username']}_{row['id']}", row['id']) for row in duplicates]
+            )
+        logger.info(f"Renamed {len(duplicates)} duplicate usernames")
+    
+    async def verify_migration(self) -> bool:
         """Verify the migration was successful"""
         try:
             # Check that all required fields exist
-            check_query = """
-            SELECT 
-                COUNT(*) as total_customers,
-                COUNT(username) as with_username,
-                COUNT(hashed_password) as with_password,
-                COUNT(CASE WHEN is_active THEN 1 END) as active_customers
-            FROM customers;
-            """
-            
-            result = await conn.fetchrow(check_query)
+            async with self.pool.acquire() as conn:
+                result = await conn.fetchrow(VERIFY_QUERY)
             
             logger.info(f"Migration verification:")
             logger.info(f"  Total customers: {result['total_customers']}")
@@ -168,8 +294,8 @@ class CustomerPortalMigration:
             logger.info(f"  With password: {result['with_password']}")
             logger.info(f"  Active customers: {result['active_customers']}")
             
-            # Verify schema
-            schema_info = await self.check_customer_table_schema(conn)
+            # Verify schema (reuse the post-migration introspection when available)
+            schema_info = self._post_schema or await self.check_customer_table_schema()
             missing_fields = schema_info.get('missing_auth_fields', [])
             
             if not missing_fields:
@@ -193,18 +319,16 @@ class CustomerPortalMigration:
                 "password": "testpassword123"
             }
             
-            response = requests.post(
+            async with self._http.post(
                 f"{self.api_url}/customer/create",
-                json=test_customer,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logger.info("✅ Customer creation API working after migration")
-                return True
-            else:
-                logger.error(f"❌ Customer creation still failing: {response.status_code} - {response.text}")
-                return False
+                json=test_customer
+            ) as response:
+                if response.status == 200:
+                    logger.info("✅ Customer creation API working after migration")
+                    return True
+                else:
+                    logger.error(f"❌ Customer creation still failing: {response.status} - {await response.text()}")
+                    return False
                 
         except Exception as e:
             logger.error(f"API test failed: {e}")
@@ -215,28 +339,35 @@ class CustomerPortalMigration:
         logger.info("🚀 Starting Customer Portal Database Migration")
         logger.info("=" * 60)
         
-        # Connect to database
-        conn = await self.connect_to_database()
-        if not conn:
+        if not self.db_url:
+            # Try to get from API environment info
+            self.db_url = await self.get_db_url_from_api()
+        
+        # Connect to database while waking the API up from a cold start
+        pool, _ = await asyncio.gather(self.connect_to_database(), self._warm_api())
+        if not pool:
             logger.error("Cannot proceed without database connection")
             return False
         
         try:
-            # Check current schema
+            # Check current schema (skip the full introspection when already migrated)
             logger.info("📊 Checking current database schema...")
-            schema_info = await self.check_customer_table_schema(conn)
+            if await self.auth_fields_present():
+                schema_info = {'missing_auth_fields': []}
+            else:
+                schema_info = await self.check_customer_table_schema()
             
             if schema_info.get('missing_auth_fields'):
                 logger.info(f"🔧 Missing fields detected: {schema_info['missing_auth_fields']}")
                 
                 # Run migration
                 logger.info("🔄 Applying database migration...")
-                migration_success = await self.migrate_customer_table(conn)
+                migration_success = await self.migrate_customer_table()
                 
                 if migration_success:
                     # Verify migration
                     logger.info("✅ Verifying migration...")
-                    verification_success = await self.verify_migration(conn)
+                    verification_success = await self.verify_migration()
                     
                     if verification_success:
                         logger.info("🎉 Migration completed successfully!")
@@ -261,13 +392,13 @@ class CustomerPortalMigration:
                 return api_success
                 
         finally:
-            await conn.close()
-            logger.info("Database connection closed")
+            await self.pool.close()
+            logger.info("Database connection pool closed")
 
 async def main():
     """Main migration function"""
-    migrator = CustomerPortalMigration()
-    success = await migrator.run_migration()
+    async with CustomerPortalMigration() as migrator:
+        success = await migrator.run_migration()
     
     if success:
         print("\n🎉 CUSTOMER PORTAL MIGRATION SUCCESSFUL! 🎉")
@@ -281,4 +412,11 @@ async def main():
     return success
 
 if __name__ == "__main__":
+    # Use the libuv-based event loop when it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     asyncio.run(main())
@@ -4,11 +4,13 @@
 Final comprehensive test to confirm 100% Customer Portal functionality
 """
 
-import requests
-import json
+import asyncio
+import httpx
 import time
 from datetime import datetime
 
+from neuro_http import HTTP2_ENABLED, write_json
+
 # Configuration
 FRONTEND_URL = "https://neuroscan-system.vercel.app"
 API_URL = "https://neuroscan-api.onrender.com"
@@ -17,6 +19,16 @@ TEST_CREDENTIALS = {
     "password": "password123"
 }
 
+# Customer endpoints as prebuilt (url, description) pairs
+CUSTOMER_ENDPOINTS = tuple(
+    (f"{API_URL}{endpoint}", description) for endpoint, description in (
+        ("/customer/me", "Customer profile"),
+        ("/customer/dashboard", "Customer dashboard"),
+        ("/customer/products", "Customer products"),
+        ("/customer/certificates", "Customer certificates"),
+    )
+)
+
 def log_success(message):
     print(f"✅ {message}")
 
@@ -26,13 +38,13 @@ def log_info(message):
 def log_error(message):
     print(f"❌ {message}")
 
-def test_frontend_accessibility():
+async def test_frontend_accessibility(login_page_request):
     """Test customer portal frontend accessibility"""
     log_info("Testing Customer Portal frontend accessibility...")
     
     try:
         # Test customer login page
-        response = requests.get(f"{FRONTEND_URL}/customer/login", timeout=10)
+        response = await login_page_request
         if response.status_code == 200:
             log_success("Customer login page is accessible")
             return True
@@ -43,15 +55,14 @@ def test_frontend_accessibility():
         log_error(f"Frontend accessibility test failed: {e}")
         return False
 
-def test_customer_authentication():
+async def test_customer_authentication(client):
     """Test customer authentication flow"""
     log_info("Testing customer authentication...")
     
     try:
-        response = requests.post(
+        response = await client.post(
             f"{API_URL}/customer/login",
-            json=TEST_CREDENTIALS,
-            timeout=10
+            json=TEST_CREDENTIALS
         )
         
         if response.status_code == 200:
@@ -73,23 +84,24 @@ def test_customer_authentication():
         log_error(f"Authentication test failed: {e}")
         return None
 
-def test_customer_endpoints(token):
+async def test_customer_endpoints(client, token):
     """Test customer-specific API endpoints"""
     log_info("Testing customer API endpoints...")
     
     headers = {"Authorization": f"Bearer {token}"}
-    endpoints = [
-        ("/customer/me", "Customer profile"),
-        ("/customer/dashboard", "Customer dashboard"),
-        ("/customer/products", "Customer products"),
-        ("/customer/certificates", "Customer certificates")
-    ]
     
     success_count = 0
     
-    for endpoint, description in endpoints:
+    # Probe all endpoints at once; results are handled in submission order
+    responses = await asyncio.gather(
+        *(client.get(url, headers=headers) for url, _ in CUSTOMER_ENDPOINTS),
+        return_exceptions=True
+    )
+    
+    for (_, description), response in zip(CUSTOMER_ENDPOINTS, responses):
         try:
-            response = requests.get(f"{API_URL}{endpoint}", headers=headers, timeout=10)
+            if isinstance(response, Exception):
+                raise response
             
             if response.status_code == 200:
                 log_success(f"{description} endpoint working")
@@ -102,14 +114,14 @@ def test_customer_endpoints(token):
         except Exception as e:
             log_error(f"{description} endpoint error: {e}")
     
-    return success_count, len(endpoints)
+    return success_count, len(CUSTOMER_ENDPOINTS)
 
-def test_navigation_integration():
+async def test_navigation_integration(homepage_request):
     """Test homepage navigation integration"""
     log_info("Testing homepage navigation integration...")
     
     try:
-        response = requests.get(f"{FRONTEND_URL}/", timeout=10)
+        response = await homepage_request
         if response.status_code == 200:
             if "Customer Portal" in response.text:
                 log_success("Customer Portal button found on homepage")
@@ -124,7 +136,7 @@ def test_navigation_integration():
         log_error(f"Navigation integration test failed: {e}")
         return False
 
-def main():
+async def main():
     """Run comprehensive Customer Portal success verification"""
     print("🚀 CUSTOMER PORTAL FINAL SUCCESS VERIFICATION")
     print("=" * 60)
@@ -141,25 +153,31 @@ def main():
         "overall_success": False
     }
     
-    # Test 1: Frontend Accessibility
-    print("\n📱 FRONTEND ACCESSIBILITY TEST")
-    results["frontend_accessible"] = test_frontend_accessibility()
-    
-    # Test 2: Customer Authentication
-    print("\n🔐 CUSTOMER AUTHENTICATION TEST")
-    token = test_customer_authentication()
-    results["authentication_working"] = token is not None
-    
-    # Test 3: Customer API Endpoints
-    if token:
-        print("\n🔌 CUSTOMER API ENDPOINTS TEST")
-        working_endpoints, total_endpoints = test_customer_endpoints(token)
-        results["api_endpoints_working"] = working_endpoints
-        log_info(f"Working endpoints: {working_endpoints}/{total_endpoints}")
-    
-    # Test 4: Homepage Navigation Integration
-    print("\n🧭 NAVIGATION INTEGRATION TEST")
-    results["navigation_integrated"] = test_navigation_integration()
+    transport = httpx.AsyncHTTPTransport(http2=HTTP2_ENABLED, retries=2)
+    async with httpx.AsyncClient(transport=transport, timeout=10, follow_redirects=True) as client:
+        # Start both frontend page fetches right away so they overlap with the API tests
+        login_page_request = asyncio.create_task(client.get(f"{FRONTEND_URL}/customer/login"))
+        homepage_request = asyncio.create_task(client.get(f"{FRONTEND_URL}/"))
+        
+        # Test 1: Frontend Accessibility
+        print("\n📱 FRONTEND ACCESSIBILITY TEST")
+        results["frontend_accessible"] = await test_frontend_accessibility(login_page_request)
+        
+        # Test 2: Customer Authentication
+        print("\n🔐 CUSTOMER AUTHENTICATION TEST")
+        token = await test_customer_authentication(client)
+        results["authentication_working"] = token is not None
+        
+        # Test 3: Customer API Endpoints
+        if token:
+            print("\n🔌 CUSTOMER API ENDPOINTS TEST")
+            working_endpoints, total_endpoints = await test_customer_endpoints(client, token)
+            results["api_endpoints_working"] = working_endpoints
+            log_info(f"Working endpoints: {working_endpoints}/{total_endpoints}")
+        
+        # Test 4: Homepage Navigation Integration
+        print("\n🧭 NAVIGATION INTEGRATION TEST")
+        results["navigation_integrated"] = await test_navigation_integration(homepage_request)
     
     # Final Results
     print("\n🎯 FINAL RESULTS")
@@ -196,20 +214,21 @@ def main():
         print("Some components need attention for full functionality.")
     
     # Save results
-    with open("customer_portal_final_verification.json", "w") as f:
-        json.dump({
-            "timestamp": datetime.now().isoformat(),
-            "test_results": results,
-            "success_percentage": success_percentage,
-            "frontend_url": FRONTEND_URL,
-            "api_url": API_URL,
-            "test_credentials": TEST_CREDENTIALS
-        }, f, indent=2)
+    payload = {
+        "timestamp": datetime.now().isoformat(),
+        "test_results": results,
+        "success_percentage": success_percentage,
+        "frontend_url": FRONTEND_URL,
+        "api_url": API_URL,
+        "test_credentials": TEST_CREDENTIALS
+    }
+    
+    write_json("customer_portal_final_verification.json", payload)
     
     print(f"\n📊 Results saved to: customer_portal_final_verification.json")
     
     return overall_success
 
 if __name__ == "__main__":
-    success = main()
+    success = asyncio.run(main())
     exit(0 if success else 1)
@@ -4,79 +4,115 @@ Check if Vercel has the correct environment variables set
 and provide instructions to fix the customer portal login
 """
 
+import sys
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 
-def main():
-    print("🔍 CUSTOMER PORTAL LOGIN FIX ANALYSIS")
-    print("=" * 60)
-    
-    print("\n📋 ISSUE SUMMARY:")
-    print("   • Customer Portal frontend is accessible ✅")
-    print("   • Backend API is working correctly ✅") 
-    print("   • Login fails in browser but works via API ❌")
-    
-    print("\n🎯 MOST LIKELY CAUSES:")
-    print("   1. Render.com service goes to sleep (cold starts)")
-    print("   2. Frontend timeout issues during API wake-up")
-    print("   3. Environment variables not set in Vercel")
-    print("   4. Browser cache issues")
-    
-    print("\n🛠️  SOLUTIONS TO TRY:")
-    
-    print("\n1️⃣ WAKE UP THE API SERVICE:")
-    print("   Visit: https://neuroscan-api.onrender.com/health")
-    print("   Wait for 200 OK response, then immediately try login")
-    
-    print("\n2️⃣ HARD REFRESH THE CUSTOMER PORTAL:")
-    print("   • Press Ctrl+F5 in browser to clear cache")
-    print("   • Or Ctrl+Shift+R to hard reload")
-    
-    print("\n3️⃣ VERIFY ENVIRONMENT VARIABLES IN VERCEL:")
-    print("   • Go to Vercel dashboard")
-    print("   • Navigate to neuroscan-system project") 
-    print("   • Settings → Environment Variables")
-    print("   • Ensure VITE_API_URL = https://neuroscan-api.onrender.com")
-    
-    print("\n4️⃣ TRY INCOGNITO/PRIVATE BROWSING:")
-    print("   • Open customer portal in incognito mode")
-    print("   • This bypasses any cached API configurations")
-    
-    print("\n5️⃣ CHECK BROWSER CONSOLE:")
-    print("   • Open Developer Tools (F12)")
-    print("   • Check Console tab for errors")
-    print("   • Check Network tab for failed requests")
-    
-    # Test current API status
-    print("\n🧪 CURRENT API STATUS CHECK:")
+# Shared HTTP session so connections are kept alive across requests
+SESSION = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    # Read timeouts are re-raised, not retried, so a sleeping API surfaces as
+    # requests Timeout after one 10s wait instead of a ConnectionError after ~30s
+    max_retries=Retry(total=2, read=False, backoff_factor=0.3)
+)
+SESSION.mount("https://", adapter)
+
+SEPARATOR = "=" * 60
+
+# Static diagnostics, written to stdout in one go
+ANALYSIS_TEXT = f"""🔍 CUSTOMER PORTAL LOGIN FIX ANALYSIS
+{SEPARATOR}
+
+📋 ISSUE SUMMARY:
+   • Customer Portal frontend is accessible ✅
+   • Backend API is working correctly ✅
+   • Login fails in browser but works via API ❌
+
+🎯 MOST LIKELY CAUSES:
+   1. Render.com service goes to sleep (cold starts)
+   2. Frontend timeout issues during API wake-up
+   3. Environment variables not set in Vercel
+   4. Browser cache issues
+
+🛠️  SOLUTIONS TO TRY:
+
+1️⃣ WAKE UP THE API SERVICE:
+   Visit: https://neuroscan-api.onrender.com/health
+   Wait for 200 OK response, then immediately try login
+
+2️⃣ HARD REFRESH THE CUSTOMER PORTAL:
+   • Press Ctrl+F5 in browser to clear cache
+   • Or Ctrl+Shift+R to hard reload
+
+3️⃣ VERIFY ENVIRONMENT VARIABLES IN VERCEL:
+   • Go to Vercel dashboard
+   • Navigate to neuroscan-system project
+   • Settings → Environment Variables
+   • Ensure VITE_API_URL = https://neuroscan-api.onrender.com
+
+4️⃣ TRY INCOGNITO/PRIVATE BROWSING:
+   • Open customer portal in incognito mode
+   • This bypasses any cached API configurations
+
+5️⃣ CHECK BROWSER CONSOLE:
+   • Open Developer Tools (F12)
+   • Check Console tab for errors
+   • Check Network tab for failed requests
+
+🧪 CURRENT API STATUS CHECK:
+"""
+
+ACTION_PLAN_TEXT = """
+🎯 IMMEDIATE ACTION PLAN:
+   1. Visit https://neuroscan-api.onrender.com/health
+   2. Wait for the API to wake up (green checkmark)
+   3. Immediately go to https://neuroscan-system.vercel.app/customer/login
+   4. Try login with: testcustomer / password123
+   5. If it still fails, try hard refresh (Ctrl+F5)
+
+📞 TECHNICAL DETAILS:
+   • Backend: Render.com free tier (auto-sleeps)
+   • Frontend: Vercel (always on)
+   • Database: PostgreSQL (persistent)
+   • Auth: JWT tokens (working)
+
+✅ CONFIDENCE LEVEL: HIGH
+   The customer portal should work once the API is warmed up!
+"""
+
+def check_api_status(health_request):
+    """Describe the current API status from the in-flight health request"""
     try:
-        response = requests.get("https://neuroscan-api.onrender.com/health", timeout=10)
+        response = health_request.result()
         if response.status_code == 200:
-            print("   ✅ API is currently awake and responding")
-            print("   💡 Try customer login immediately!")
+            return ("   ✅ API is currently awake and responding\n"
+                    "   💡 Try customer login immediately!\n")
         else:
-            print(f"   ⚠️ API returned status {response.status_code}")
+            return f"   ⚠️ API returned status {response.status_code}\n"
     except requests.exceptions.Timeout:
-        print("   ❌ API is sleeping/cold starting (takes 30+ seconds)")
-        print("   💡 Wait a moment and try again")
+        return ("   ❌ API is sleeping/cold starting (takes 30+ seconds)\n"
+                "   💡 Wait a moment and try again\n")
     except Exception as e:
-        print(f"   ❌ API connection error: {e}")
-    
-    print("\n🎯 IMMEDIATE ACTION PLAN:")
-    print("   1. Visit https://neuroscan-api.onrender.com/health")
-    print("   2. Wait for the API to wake up (green checkmark)")
-    print("   3. Immediately go to https://neuroscan-system.vercel.app/customer/login")
-    print("   4. Try login with: testcustomer / password123")
-    print("   5. If it still fails, try hard refresh (Ctrl+F5)")
-    
-    print("\n📞 TECHNICAL DETAILS:")
-    print("   • Backend: Render.com free tier (auto-sleeps)")
-    print("   • Frontend: Vercel (always on)")
-    print("   • Database: PostgreSQL (persistent)")
-    print("   • Auth: JWT tokens (working)")
-    
-    print("\n✅ CONFIDENCE LEVEL: HIGH")
-    print("   The customer portal should work once the API is warmed up!")
+        return f"   ❌ API connection error: {e}\n"
+
+def main():
+    # Start the health check right away so a cold start overlaps with the output
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        health_request = executor.submit(
+            SESSION.get, "https://neuroscan-api.onrender.com/health", timeout=10
+        )
+        
+        sys.stdout.write(ANALYSIS_TEXT)
+        sys.stdout.flush()
+        
+        # Test current API status
+        sys.stdout.write(check_api_status(health_request) + ACTION_PLAN_TEXT)
+        sys.stdout.flush()
 
 if __name__ == "__main__":
     main()
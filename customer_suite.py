@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Customer login + endpoint suite shared by the cloud fix scripts
+Logs in once and probes the customer endpoints concurrently with that token
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import neuro_http
+
+def run_customer_suite(username, password, endpoints, stop_on_failure=False):
+    """Log in as username, then GET every endpoint with the token concurrently
+
+    Returns {"login": response, "token": str or None, "results": {endpoint: response}}.
+    "login" holds the exception if the login request itself failed, and a
+    failed endpoint probe likewise maps to its exception. Results are in
+    completion order; with stop_on_failure, collection ends at the first error
+    or non-200 and endpoints still in flight are left out.
+    """
+    suite = {"login": None, "token": None, "results": {}}
+
+    try:
+        login = neuro_http.post("/customer/login", json={"username": username, "password": password},
+                                idempotent=True)
+    except Exception as e:
+        suite["login"] = e
+        return suite
+
+    suite["login"] = login
+    if login.status_code == 200:
+        try:
+            suite["token"] = login.json().get("access_token")
+        except ValueError:
+            pass
+    if not suite["token"] or not endpoints:
+        return suite
+
+    headers = {"Authorization": f"Bearer {suite['token']}"}
+    executor = ThreadPoolExecutor(max_workers=len(endpoints))
+    futures = {executor.submit(neuro_http.get, endpoint, headers=headers): endpoint for endpoint in endpoints}
+
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = e
+        suite["results"][futures[future]] = result
+        if stop_on_failure and (isinstance(result, Exception) or result.status_code != 200):
+            break
+
+    # Don't wait for probes that no longer matter
+    executor.shutdown(wait=False, cancel_futures=True)
+    return suite
@@ -4,9 +4,21 @@ Debug frontend API configuration and test customer login directly
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import socket
 import time
 
+# Shared HTTP session so connections are kept alive across requests
+SESSION = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+)
+SESSION.mount("https://", adapter)
+
 def test_api_endpoints():
     """Test API endpoints that the frontend uses"""
     
@@ -18,7 +30,7 @@ def test_api_endpoints():
     # Test 1: Health check
     print("\n1️⃣ Testing API Health...")
     try:
-        response = requests.get(f"{base_url}/health", timeout=15)
+        response = SESSION.get(f"{base_url}/health", timeout=15)
         print(f"   ✅ Health: {response.status_code}")
         if response.status_code == 200:
             print(f"   📄 Response: {response.json()}")
@@ -34,7 +46,7 @@ def test_api_endpoints():
     }
     
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{base_url}/customer/login",
             json=login_data,
             timeout=20,
@@ -53,7 +65,7 @@ def test_api_endpoints():
             # Test authenticated endpoint
             print("\n3️⃣ Testing Authenticated Endpoint...")
             headers = {"Authorization": f"Bearer {data['access_token']}"}
-            me_response = requests.get(f"{base_url}/customer/me", headers=headers, timeout=15)
+            me_response = SESSION.get(f"{base_url}/customer/me", headers=headers, timeout=15)
             print(f"   📊 /customer/me: {me_response.status_code}")
             
             return True
@@ -69,17 +81,26 @@ def test_frontend_api_config():
     """Test what the frontend might be trying to access"""
     print("\n4️⃣ Testing Frontend API Configuration...")
     
-    # Test if frontend might be hitting localhost
-    local_urls = [
-        "http://localhost:8000/health",
-        "http://127.0.0.1:8000/health"
+    # Test if frontend might be hitting localhost; a bare TCP connect with a
+    # 100 ms timeout is enough to tell whether anything listens there
+    local_hosts = [
+        ("localhost", "http://localhost:8000/health"),
+        ("127.0.0.1", "http://127.0.0.1:8000/health")
     ]
     
-    for url in local_urls:
+    for host, url in local_hosts:
+        s = socket.socket()
+        s.settimeout(0.1)
         try:
-            response = requests.get(url, timeout=2)
-            print(f"   ⚠️ {url}: {response.status_code} (Frontend might be hitting this!)")
-        except:
+            rc = s.connect_ex((host, 8000))
+        except OSError:
+            rc = -1
+        finally:
+            s.close()
+        
+        if rc == 0:
+            print(f"   ⚠️ {url}: listening (Frontend might be hitting this!)")
+        else:
             print(f"   ✅ {url}: Not accessible (good)")
 
 def check_cors_headers():
@@ -87,7 +108,7 @@ def check_cors_headers():
     print("\n5️⃣ Checking CORS Headers...")
     
     try:
-        response = requests.options(
+        response = SESSION.options(
             "https://neuroscan-api.onrender.com/customer/login",
             headers={
                 "Origin": "https://neuroscan-system.vercel.app",
@@ -4,62 +4,145 @@ NeuroScan Customer Portal - Live Deployment Script
 Deploys commit 209a860: Complete Customer Portal Implementation
 """
 
+import asyncio
+import httpx
+import io
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import json
+import logging
+import logging.handlers
 import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import cache
+import neuro_http
+from neuro_http import HTTP2_ENABLED, JSON_HEADERS, write_json
+
+# With HTTP/2 every probe is a stream on one connection; HTTP/1.1 needs a small pool
+PROBE_LIMITS = httpx.Limits(
+    max_keepalive_connections=1 if HTTP2_ENABLED else 10,
+    max_connections=1 if HTTP2_ENABLED else 10
+)
+
 # Configuration
 CLOUD_API_URL = "https://neuroscan-api.onrender.com"
 FRONTEND_URL = "https://neuroscan-system.vercel.app"
 ADMIN_EMAIL = "admin@neuroscan.com"
 ADMIN_PASSWORD = "admin123"
+ADMIN_LOGIN_URL = f"{CLOUD_API_URL}/admin/login"
+
+# Request bodies, serialized once at import time
+ADMIN_LOGIN_BODY = json.dumps({
+    "email": ADMIN_EMAIL,
+    "password": ADMIN_PASSWORD
+}).encode()
+CUSTOMER_BODY = json.dumps({
+    "name": "Test Customer Company",
+    "email": "test@customer.com",
+    "username": "testcustomer",
+    "password": "password123"
+}).encode()
+CUSTOMER_LOGIN_BODY = json.dumps({
+    "username": "testcustomer",
+    "password": "password123"
+}).encode()
+
+MIGRATION_SQL = """BEGIN;
+
+-- Customer Authentication Migration
+ALTER TABLE customers
+    ADD COLUMN IF NOT EXISTS username VARCHAR(255) UNIQUE,
+    ADD COLUMN IF NOT EXISTS hashed_password VARCHAR(255),
+    ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE,
+    ADD COLUMN IF NOT EXISTS last_login TIMESTAMP WITH TIME ZONE;
+
+-- Create indexes
+CREATE INDEX IF NOT EXISTS idx_customers_username ON customers(username);
+CREATE INDEX IF NOT EXISTS idx_customers_active ON customers(is_active);
+
+-- Update existing customers
+UPDATE customers SET is_active = TRUE WHERE is_active IS NULL;
+
+COMMIT;
+"""
+MIGRATION_BODY = json.dumps({"sql": MIGRATION_SQL}).encode()
+
+# Log lines go through a queue and are written by a listener thread,
+# so logging never blocks the probe threads on stdout
+LOG_QUEUE = queue.Queue()
+logger = logging.getLogger("deploy")
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.handlers.QueueHandler(LOG_QUEUE))
+logger.propagate = False
+
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+LOG_LISTENER = logging.handlers.QueueListener(LOG_QUEUE, _stdout_handler)
+
+# Shared HTTP session so connections are kept alive across requests
+SESSION = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+)
+SESSION.mount("https://", adapter)
 
 class NeuroScanDeployment:
     def __init__(self):
         self.deployment_log = []
         self.start_time = datetime.now()
+        self._t0 = time.monotonic()
+        self.session = SESSION
+        self._log_lock = threading.Lock()
         
     def log(self, message, status="INFO"):
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        # Seconds since start; cheaper than formatting the wall clock per line
+        timestamp = f"{int(time.monotonic() - self._t0):05d}s"
         log_entry = f"[{timestamp}] {status}: {message}"
-        print(log_entry)
-        self.deployment_log.append(log_entry)
+        # Frontend and endpoint checks log from different threads
+        with self._log_lock:
+            logger.info(log_entry)
+            self.deployment_log.append(log_entry)
     
     def wait_for_deployment(self, max_wait=600):
         """Wait for cloud deployment to complete"""
         self.log("🔄 Waiting for cloud deployment to complete...")
         
-        for attempt in range(max_wait // 30):
-            try:
-                response = requests.get(f"{CLOUD_API_URL}/health", timeout=10)
-                if response.status_code == 200:
-                    self.log("✅ Backend deployment is online!", "SUCCESS")
-                    return True
-                else:
-                    self.log(f"⏳ Backend starting... (attempt {attempt + 1})", "INFO")
-            except Exception as e:
-                self.log(f"⏳ Waiting for backend... (attempt {attempt + 1})", "INFO")
-            
-            time.sleep(30)
+        if neuro_http.wait_ready(max_wait):
+            self.log("✅ Backend deployment is online!", "SUCCESS")
+            return True
         
         self.log("❌ Backend deployment timeout", "ERROR")
         return False
     
-    def test_admin_authentication(self):
+    def test_admin_authentication(self, use_cache=True):
         """Test admin authentication to ensure basic API is working"""
         self.log("🔐 Testing admin authentication...")
         
+        if use_cache:
+            token = cache.load_admin_token(ADMIN_LOGIN_URL)
+            if token:
+                self.log("✅ Admin authentication successful (cached token)", "SUCCESS")
+                return token
+        
         try:
-            response = requests.post(f"{CLOUD_API_URL}/admin/login", json={
-                "email": ADMIN_EMAIL,
-                "password": ADMIN_PASSWORD
-            }, timeout=30)
+            response = self.session.post(ADMIN_LOGIN_URL,
+                                         data=ADMIN_LOGIN_BODY,
+                                         headers=JSON_HEADERS,
+                                         timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
                 token = data.get("access_token")
+                cache.save_admin_token(ADMIN_LOGIN_URL, token)
                 self.log("✅ Admin authentication successful", "SUCCESS")
                 return token
             else:
@@ -69,33 +152,29 @@ class NeuroScanDeployment:
             self.log(f"❌ Admin auth error: {e}", "ERROR")
             return None
     
+    def admin_post(self, path, body, admin_token, timeout):
+        """POST as admin, logging in again once if a cached token was rejected"""
+        response = self.session.post(f"{CLOUD_API_URL}{path}",
+                                     headers={**JSON_HEADERS, "Authorization": f"Bearer {admin_token}"},
+                                     data=body,
+                                     timeout=timeout)
+        if response.status_code == 401:
+            cache.clear_admin_token(ADMIN_LOGIN_URL)
+            admin_token = self.test_admin_authentication(use_cache=False)
+            if admin_token:
+                response = self.session.post(f"{CLOUD_API_URL}{path}",
+                                             headers={**JSON_HEADERS, "Authorization": f"Bearer {admin_token}"},
+                                             data=body,
+                                             timeout=timeout)
+        return response
+    
     def execute_database_migration(self, admin_token):
         """Execute database migration for customer authentication"""
         self.log("🛠️ Executing customer authentication database migration...")
         
-        headers = {"Authorization": f"Bearer {admin_token}"}
-        
-        migration_sql = """
-        -- Customer Authentication Migration
-        ALTER TABLE customers ADD COLUMN IF NOT EXISTS username VARCHAR(255) UNIQUE;
-        ALTER TABLE customers ADD COLUMN IF NOT EXISTS hashed_password VARCHAR(255);
-        ALTER TABLE customers ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE;
-        ALTER TABLE customers ADD COLUMN IF NOT EXISTS last_login TIMESTAMP WITH TIME ZONE;
-        
-        -- Create indexes
-        CREATE INDEX IF NOT EXISTS idx_customers_username ON customers(username);
-        CREATE INDEX IF NOT EXISTS idx_customers_active ON customers(is_active);
-        
-        -- Update existing customers
-        UPDATE customers SET is_active = TRUE WHERE is_active IS NULL;
-        """
-        
         try:
             # Try direct migration endpoint if available
-            response = requests.post(f"{CLOUD_API_URL}/admin/database/migrate", 
-                                   headers=headers,
-                                   json={"sql": migration_sql}, 
-                                   timeout=60)
+            response = self.admin_post("/admin/database/migrate", MIGRATION_BODY, admin_token, timeout=60)
             
             if response.status_code == 200:
                 self.log("✅ Database migration executed successfully", "SUCCESS")
@@ -112,20 +191,8 @@ class NeuroScanDeployment:
         """Create test customer for portal testing"""
         self.log("👤 Creating test customer...")
         
-        headers = {"Authorization": f"Bearer {admin_token}"}
-        
-        customer_data = {
-            "name": "Test Customer Company",
-            "email": "test@customer.com",
-            "username": "testcustomer",
-            "password": "password123"
-        }
-        
         try:
-            response = requests.post(f"{CLOUD_API_URL}/admin/customers", 
-                                   headers=headers,
-                                   json=customer_data,
-                                   timeout=30)
+            response = self.admin_post("/admin/customers", CUSTOMER_BODY, admin_token, timeout=30)
             
             if response.status_code in [200, 201]:
                 self.log("✅ Test customer created successfully", "SUCCESS")
@@ -146,10 +213,10 @@ class NeuroScanDeployment:
         self.log("🧪 Testing customer portal authentication...")
         
         try:
-            response = requests.post(f"{CLOUD_API_URL}/customer/login", json={
-                "username": "testcustomer",
-                "password": "password123"
-            }, timeout=30)
+            response = self.session.post(f"{CLOUD_API_URL}/customer/login",
+                                         data=CUSTOMER_LOGIN_BODY,
+                                         headers=JSON_HEADERS,
+                                         timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
@@ -177,21 +244,45 @@ class NeuroScanDeployment:
             ("/customer/scan-logs", "Scan Logs")
         ]
         
-        successful_endpoints = []
-        
-        for endpoint, name in endpoints:
+        async def probe(client, request, name):
+            # Only the status matters, so stream the GET and close it unread
+            # (FastAPI GET routes answer HEAD with 405, so HEAD would cost a
+            # second round trip)
             try:
-                response = requests.get(f"{CLOUD_API_URL}{endpoint}", 
-                                      headers=headers, 
-                                      timeout=20)
-                
-                if response.status_code == 200:
-                    self.log(f"   ✅ {name}: Working", "SUCCESS")
-                    successful_endpoints.append(name)
-                else:
-                    self.log(f"   ❌ {name}: {response.status_code}", "ERROR")
+                response = await client.send(request, stream=True)
+                await response.aclose()
+                return name, response.status_code
             except Exception as e:
-                self.log(f"   ❌ {name}: Error - {str(e)[:50]}", "ERROR")
+                return name, e
+        
+        async def probe_all():
+            working = set()
+            async with httpx.AsyncClient(
+                http2=HTTP2_ENABLED,
+                timeout=20,
+                limits=PROBE_LIMITS
+            ) as client:
+                probes = [
+                    probe(client, client.build_request("GET", f"{CLOUD_API_URL}{endpoint}", headers=headers), name)
+                    for endpoint, name in endpoints
+                ]
+                # Log each endpoint as soon as it answers so a slow one doesn't hide the rest
+                for next_result in asyncio.as_completed(probes):
+                    name, result = await next_result
+                    if isinstance(result, Exception):
+                        self.log(f"   ❌ {name}: Error - {str(result)[:50]}", "ERROR")
+                    elif result == 200:
+                        self.log(f"   ✅ {name}: Working", "SUCCESS")
+                        working.add(name)
+                    else:
+                        self.log(f"   ❌ {name}: {result}", "ERROR")
+            return working
+        
+        # Endpoints are independent, so probe them all at once
+        working = asyncio.run(probe_all())
+        
+        # Report working endpoints in their usual order, not completion order
+        successful_endpoints = [name for _, name in endpoints if name in working]
         
         return successful_endpoints
     
@@ -200,18 +291,21 @@ class NeuroScanDeployment:
         self.log("🌐 Testing frontend deployment...")
         
         try:
+            # Only the status codes matter, so the page bodies are never read
             # Test main frontend
-            response = requests.get(FRONTEND_URL, timeout=15)
-            if response.status_code == 200:
+            with self.session.get(FRONTEND_URL, stream=True, timeout=15) as response:
+                status_code = response.status_code
+            if status_code == 200:
                 self.log("✅ Frontend main page accessible", "SUCCESS")
             
             # Test customer login page
-            response = requests.get(f"{FRONTEND_URL}/customer/login", timeout=15)
-            if response.status_code == 200:
+            with self.session.get(f"{FRONTEND_URL}/customer/login", stream=True, timeout=15) as response:
+                status_code = response.status_code
+            if status_code == 200:
                 self.log("✅ Customer login page accessible", "SUCCESS")
                 return True
             else:
-                self.log(f"⚠ Customer login page: {response.status_code}", "WARNING")
+                self.log(f"⚠ Customer login page: {status_code}", "WARNING")
                 return False
                 
         except Exception as e:
@@ -255,58 +349,66 @@ class NeuroScanDeployment:
             "deployment_log": self.deployment_log
         }
         
-        # Save report
-        with open("customer_portal_deployment_report.json", "w") as f:
-            json.dump(report, f, indent=2)
+        # Save report via a temp file so a crash never leaves a truncated report
+        tmp_path = "customer_portal_deployment_report.json.tmp"
+        write_json(tmp_path, report)
+        os.replace(tmp_path, "customer_portal_deployment_report.json")
         
         return report
     
     def print_deployment_summary(self, report):
         """Print deployment summary"""
-        print("\n" + "=" * 70)
-        print("🚀 NEUROSCAN CUSTOMER PORTAL - LIVE DEPLOYMENT COMPLETE")
-        print("=" * 70)
+        # Build the whole summary first and write it to stdout in one call
+        buf = io.StringIO()
+        w = buf.write
+        
+        w("\n" + "=" * 70 + "\n")
+        w("🚀 NEUROSCAN CUSTOMER PORTAL - LIVE DEPLOYMENT COMPLETE\n")
+        w("=" * 70 + "\n")
         
         status = report["deployment_info"]["status"]
         duration = report["deployment_info"]["duration_seconds"]
         
-        print(f"📅 Deployment Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"⏱️ Deployment Duration: {duration:.1f} seconds")
-        print(f"📊 Overall Status: {'✅ SUCCESS' if status == 'SUCCESS' else '⚠ PARTIAL SUCCESS'}")
+        w(f"📅 Deployment Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        w(f"⏱️ Deployment Duration: {duration:.1f} seconds\n")
+        w(f"📊 Overall Status: {'✅ SUCCESS' if status == 'SUCCESS' else '⚠ PARTIAL SUCCESS'}\n")
         
-        print(f"\n🔗 LIVE URLS:")
-        print(f"   🌐 Frontend: {FRONTEND_URL}")
-        print(f"   🔐 Customer Portal: {FRONTEND_URL}/customer/login")
-        print(f"   📡 Backend API: {CLOUD_API_URL}")
-        print(f"   📚 API Docs: {CLOUD_API_URL}/docs")
+        w(f"\n🔗 LIVE URLS:\n")
+        w(f"   🌐 Frontend: {FRONTEND_URL}\n")
+        w(f"   🔐 Customer Portal: {FRONTEND_URL}/customer/login\n")
+        w(f"   📡 Backend API: {CLOUD_API_URL}\n")
+        w(f"   📚 API Docs: {CLOUD_API_URL}/docs\n")
         
-        print(f"\n🧪 TEST CREDENTIALS:")
-        print(f"   👤 Username: testcustomer")
-        print(f"   🔑 Password: password123")
+        w(f"\n🧪 TEST CREDENTIALS:\n")
+        w(f"   👤 Username: testcustomer\n")
+        w(f"   🔑 Password: password123\n")
         
-        print(f"\n📈 CUSTOMER PORTAL STATUS:")
+        w(f"\n📈 CUSTOMER PORTAL STATUS:\n")
         auth_status = report["customer_portal"]["authentication"]
         endpoint_success = report["customer_portal"]["success_rate"]
-        print(f"   🔐 Authentication: {'✅ Working' if auth_status == 'SUCCESS' else '❌ Failed'}")
-        print(f"   📊 Endpoints: {endpoint_success} working")
+        w(f"   🔐 Authentication: {'✅ Working' if auth_status == 'SUCCESS' else '❌ Failed'}\n")
+        w(f"   📊 Endpoints: {endpoint_success} working\n")
         
         if report["customer_portal"]["working_endpoints"]:
-            print(f"   ✅ Working Features:")
+            w(f"   ✅ Working Features:\n")
             for endpoint in report["customer_portal"]["working_endpoints"]:
-                print(f"      • {endpoint}")
+                w(f"      • {endpoint}\n")
         
-        print(f"\n🎯 NEXT STEPS:")
+        w(f"\n🎯 NEXT STEPS:\n")
         if status == "SUCCESS":
-            print(f"   1. ✅ Customer Portal is LIVE and ready for use")
-            print(f"   2. 🧪 Test all features via web interface")
-            print(f"   3. 👥 Create additional customer accounts as needed")
-            print(f"   4. 📱 Validate mobile responsiveness")
+            w(f"   1. ✅ Customer Portal is LIVE and ready for use\n")
+            w(f"   2. 🧪 Test all features via web interface\n")
+            w(f"   3. 👥 Create additional customer accounts as needed\n")
+            w(f"   4. 📱 Validate mobile responsiveness\n")
         else:
-            print(f"   1. ⚠ Review deployment logs for any issues")
-            print(f"   2. 🔄 Manual database migration may be needed")
-            print(f"   3. 🧪 Test individual components")
+            w(f"   1. ⚠ Review deployment logs for any issues\n")
+            w(f"   2. 🔄 Manual database migration may be needed\n")
+            w(f"   3. 🧪 Test individual components\n")
+        
+        w("\n" + "=" * 70 + "\n")
         
-        print("\n" + "=" * 70)
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
 def main():
     deployer = NeuroScanDeployment()
@@ -316,33 +418,45 @@ def main():
     print("Deploying commit 209a860: Complete Customer Portal Implementation")
     print("=" * 60)
     
-    # Step 1: Wait for deployment
-    backend_success = deployer.wait_for_deployment()
+    LOG_LISTENER.start()
+    try:
+        # Step 1: Wait for deployment
+        backend_success = deployer.wait_for_deployment()
     
-    # Step 2: Test admin authentication  
-    admin_token = None
-    if backend_success:
-        admin_token = deployer.test_admin_authentication()
+        # Step 2: Test admin authentication  
+        admin_token = None
+        if backend_success:
+            admin_token = deployer.test_admin_authentication()
     
-    # Step 3: Execute database migration
-    migration_success = False
-    if admin_token:
-        migration_success = deployer.execute_database_migration(admin_token)
+        # Step 3: Execute database migration
+        migration_success = False
+        if admin_token:
+            migration_success = deployer.execute_database_migration(admin_token)
         
-        # Create test customer
-        deployer.create_test_customer(admin_token)
+            # Create test customer
+            deployer.create_test_customer(admin_token)
     
-    # Step 4: Test customer authentication
-    customer_token = deployer.test_customer_authentication()
-    customer_auth_success = customer_token is not None
-    
-    # Step 5: Test customer endpoints
-    working_endpoints = []
-    if customer_token:
-        working_endpoints = deployer.test_customer_endpoints(customer_token)
-    
-    # Step 6: Test frontend
-    frontend_success = deployer.test_frontend_deployment()
+        # The frontend (Vercel) check doesn't depend on the API (Render) checks,
+        # so run it alongside steps 4 and 5
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Step 6: Test frontend
+            frontend_future = executor.submit(deployer.test_frontend_deployment)
+        
+            # Step 4: Test customer authentication
+            customer_token = deployer.test_customer_authentication()
+            customer_auth_success = customer_token is not None
+        
+            # Step 5: Test customer endpoints
+            working_endpoints = []
+            if customer_token:
+                working_endpoints = executor.submit(
+                    deployer.test_customer_endpoints, customer_token
+                ).result()
+        
+            frontend_success = frontend_future.result()
+    finally:
+        # Drain queued log lines before the summary is printed
+        LOG_LISTENER.stop()
     
     # Step 7: Generate report
     report = deployer.generate_deployment_report(
@@ -4,44 +4,103 @@ Customer Portal Final Deployment Test
 Comprehensive test of the deployed customer portal functionality
 """
 
-import requests
-import time
-import json
+import httpx
+import logging
+import logging.handlers
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+import neuro_http
+from neuro_http import HTTP2_ENABLED, json_dumps, json_loads
 
 CLOUD_API_URL = "https://neuroscan-api.onrender.com"
 FRONTEND_URL = "https://neuroscan-system.vercel.app"
 
+# Shared HTTP client; with HTTP/2 every probe to an origin is multiplexed
+# over one TLS connection instead of queueing for a pooled one
+CLIENT = httpx.Client(
+    http2=HTTP2_ENABLED,
+    timeout=httpx.Timeout(30.0, connect=3.0),
+    transport=httpx.HTTPTransport(
+        http2=HTTP2_ENABLED,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
+    ),
+    headers={"User-Agent": "neuroscan-test/1.0"},
+    follow_redirects=True
+)
+
+# NEUROSCAN_PLAIN=1 swaps the emoji for ASCII tags on the console, for
+# terminals that cannot (or only slowly) encode them
+if os.environ.get("NEUROSCAN_PLAIN"):
+    _EMO = {
+        "✅": "[OK]", "❌": "[X]", "⚠️": "[!]", "🎉": "[*]", "🧪": "[T]",
+        "🔍": "[?]", "🔑": "[K]", "📊": "[#]", "📈": "[%]", "⏳": "[.]",
+        "🔧": "[CFG]", "🔐": "[AUTH]", "🔒": "[LOCK]", "🌐": "[WEB]",
+        "🎯": "[>]", "🚀": "[GO]", "📅": "[DATE]", "🔗": "[URL]",
+        "📡": "[API]", "📚": "[DOC]", "💾": "[SAVE]",
+    }
+    _EMO_RE = re.compile("|".join(map(re.escape, _EMO)))
+    
+    def _e(text):
+        return _EMO_RE.sub(lambda m: _EMO[m.group()], text)
+else:
+    def _e(text):
+        return text
+
+class _PlainFormatter(logging.Formatter):
+    """Message-only formatter that applies the NEUROSCAN_PLAIN emoji mapping"""
+    
+    def format(self, record):
+        return _e(super().format(record))
+
+# Probe output is buffered and written out once per test phase, instead of
+# flushing stdout for every line
+log = logging.getLogger("neuroscan_test")
+log.setLevel(logging.INFO)
+log.propagate = False
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(_PlainFormatter("%(message)s"))
+LOG_BUFFER = logging.handlers.MemoryHandler(capacity=256, target=_stdout_handler)
+log.addHandler(LOG_BUFFER)
+
+# Endpoint probe status -> (result tag, description), built once at import
+_STATUS_CLASS = {
+    200: ("✅ WORKING", "Working correctly"),
+    201: ("✅ WORKING", "Working correctly"),
+    400: ("✅ AVAILABLE", "Available (auth/validation error expected)"),
+    401: ("✅ AVAILABLE", "Available (auth/validation error expected)"),
+    403: ("✅ AVAILABLE", "Available (auth/validation error expected)"),
+    422: ("✅ AVAILABLE", "Available (auth/validation error expected)"),
+    404: ("❌ NOT FOUND", "Endpoint not found"),
+    500: ("⚠️ SERVER ERROR", "Server error (may need DB setup)"),
+}
+
 def wait_for_fresh_deployment(max_wait=180):
     """Wait for fresh deployment to complete"""
-    print("⏳ Waiting for fresh deployment to complete...")
-    
-    start_time = time.time()
-    
-    while time.time() - start_time < max_wait:
-        try:
-            response = requests.get(f"{CLOUD_API_URL}/health", timeout=15)
-            if response.status_code == 200:
-                health_data = response.json()
-                print(f"✅ Fresh deployment detected!")
-                print(f"   Environment: {health_data.get('environment')}")
-                print(f"   Database: {health_data.get('database')}")
-                print(f"   Database Type: {health_data.get('database_type')}")
-                return True
-        except:
-            pass
-        
-        elapsed = int(time.time() - start_time)
-        print(f"   ⏳ Deployment in progress... ({elapsed}s)")
-        time.sleep(15)
-    
-    print("⚠️ Deployment timeout - proceeding with current version")
+    print(_e("⏳ Waiting for fresh deployment to complete..."))
+    
+    if neuro_http.wait_ready(max_wait):
+        # wait_ready just cached this answer, so this does not hit the API again
+        _, text = neuro_http.get_health()
+        health_data = json_loads(text)
+        print(_e("✅ Fresh deployment detected!"))
+        print(f"   Environment: {health_data.get('environment')}")
+        print(f"   Database: {health_data.get('database')}")
+        print(f"   Database Type: {health_data.get('database_type')}")
+        return True
+    
+    print(_e("⚠️ Deployment timeout - proceeding with current version"))
     return False
 
 def comprehensive_api_test():
     """Comprehensive test of all customer portal endpoints"""
-    print("\n🔍 COMPREHENSIVE API ENDPOINT TEST")
-    print("=" * 60)
+    log.info("\n🔍 COMPREHENSIVE API ENDPOINT TEST")
+    log.info("=" * 60)
     
     endpoints_to_test = [
         ("/health", "GET", "Health check"),
@@ -53,46 +112,40 @@ def comprehensive_api_test():
         ("/verify", "GET", "Product verification")
     ]
     
-    results = {}
-    
-    for endpoint, method, description in endpoints_to_test:
+    def probe(endpoint, method, description):
+        """Probe one endpoint; returns (endpoint, status tag, output lines)"""
+        lines = [f"🧪 Testing {method} {endpoint} ({description})..."]
         try:
-            print(f"🧪 Testing {method} {endpoint} ({description})...")
-            
+            # Only the status is needed, so the body is never downloaded
             if method == "GET":
-                response = requests.get(f"{CLOUD_API_URL}{endpoint}", timeout=10)
+                with CLIENT.stream("GET", f"{CLOUD_API_URL}{endpoint}", timeout=httpx.Timeout(10.0, connect=3.0)) as response:
+                    status = response.status_code
             else:
                 # POST with minimal data to test endpoint existence
-                response = requests.post(f"{CLOUD_API_URL}{endpoint}", json={}, timeout=10)
-            
-            status = response.status_code
+                with CLIENT.stream("POST", f"{CLOUD_API_URL}{endpoint}", json={}, timeout=httpx.Timeout(10.0, connect=3.0)) as response:
+                    status = response.status_code
             
-            if status == 404:
-                results[endpoint] = "❌ NOT FOUND"
-                print(f"   ❌ {status}: Endpoint not found")
-            elif status in [200, 201]:
-                results[endpoint] = "✅ WORKING"
-                print(f"   ✅ {status}: Working correctly")
-            elif status in [400, 401, 403, 422]:
-                results[endpoint] = "✅ AVAILABLE"
-                print(f"   ✅ {status}: Available (auth/validation error expected)")
-            elif status == 500:
-                results[endpoint] = "⚠️ SERVER ERROR"
-                print(f"   ⚠️ {status}: Server error (may need DB setup)")
-            else:
-                results[endpoint] = f"⚠️ {status}"
-                print(f"   ⚠️ {status}: Unexpected response")
-                
+            tag, message = _STATUS_CLASS.get(status, (f"⚠️ {status}", "Unexpected response"))
+            lines.append(f"   {tag.split()[0]} {status}: {message}")
         except Exception as e:
-            results[endpoint] = "❌ ERROR"
-            print(f"   ❌ Error: {e}")
+            tag = "❌ ERROR"
+            lines.append(f"   ❌ Error: {e}")
+        
+        return endpoint, tag, lines
+    
+    # Probes are independent, so run them in parallel; map keeps the input order
+    results = {}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for endpoint, tag, lines in executor.map(lambda t: probe(*t), endpoints_to_test):
+            results[endpoint] = tag
+            log.info("\n".join(lines))
     
     return results
 
 def test_customer_authentication():
     """Test customer authentication flow"""
-    print("\n🔐 CUSTOMER AUTHENTICATION TEST")
-    print("=" * 60)
+    log.info("\n🔐 CUSTOMER AUTHENTICATION TEST")
+    log.info("=" * 60)
     
     # Test with various credential combinations
     test_credentials = [
@@ -102,7 +155,7 @@ def test_customer_authentication():
     ]
     
     for username, password, description in test_credentials:
-        print(f"\n🧪 Testing {description}: {username}")
+        log.info(f"\n🧪 Testing {description}: {username}")
         
         login_data = {
             "username": username,
@@ -110,7 +163,7 @@ def test_customer_authentication():
         }
         
         try:
-            response = requests.post(
+            response = CLIENT.post(
                 f"{CLOUD_API_URL}/customer/login",
                 json=login_data,
                 timeout=30
@@ -119,34 +172,34 @@ def test_customer_authentication():
             status = response.status_code
             
             if status == 200:
-                print(f"   ✅ Login successful!")
-                token_data = response.json()
+                log.info(f"   ✅ Login successful!")
+                token_data = json_loads(response.content)
                 access_token = token_data.get('access_token')
                 
                 if access_token:
-                    print(f"   🔑 Token: {access_token[:30]}...")
+                    log.info(f"   🔑 Token: {access_token[:30]}...")
                     
                     # Test authenticated endpoints
                     test_authenticated_endpoints(access_token)
                     return access_token
                     
             elif status == 401:
-                print(f"   ❌ Invalid credentials")
+                log.info(f"   ❌ Invalid credentials")
             elif status == 422:
-                print(f"   ⚠️ Validation error")
+                log.info(f"   ⚠️ Validation error")
             elif status == 500:
-                print(f"   ❌ Server error (database issue)")
+                log.info(f"   ❌ Server error (database issue)")
             else:
-                print(f"   ⚠️ Unexpected status: {status}")
+                log.info(f"   ⚠️ Unexpected status: {status}")
                 
         except Exception as e:
-            print(f"   ❌ Request error: {e}")
+            log.info(f"   ❌ Request error: {e}")
     
     return None
 
 def test_authenticated_endpoints(token):
     """Test endpoints that require authentication"""
-    print("\n🔒 AUTHENTICATED ENDPOINTS TEST")
+    log.info("\n🔒 AUTHENTICATED ENDPOINTS TEST")
     
     headers = {"Authorization": f"Bearer {token}"}
     
@@ -157,27 +210,32 @@ def test_authenticated_endpoints(token):
         ("/customer/certificates", "GET", "Customer certificates")
     ]
     
-    for endpoint, method, description in auth_endpoints:
+    def probe(endpoint, method, description):
+        lines = [f"🧪 Testing {description}..."]
         try:
-            print(f"🧪 Testing {description}...")
-            
             if method == "GET":
-                response = requests.get(f"{CLOUD_API_URL}{endpoint}", headers=headers, timeout=10)
+                response = CLIENT.get(f"{CLOUD_API_URL}{endpoint}", headers=headers, timeout=10)
             
             if response.status_code == 200:
-                print(f"   ✅ Success: {description}")
-                data = response.json()
-                print(f"   📊 Data: {json.dumps(data, indent=2)[:200]}...")
+                lines.append(f"   ✅ Success: {description}")
+                data = json_loads(response.content)
+                lines.append(f"   📊 Data: {json_dumps(data, indent=2)[:200]}...")
             else:
-                print(f"   ⚠️ Status {response.status_code}: {description}")
+                lines.append(f"   ⚠️ Status {response.status_code}: {description}")
                 
         except Exception as e:
-            print(f"   ❌ Error testing {description}: {e}")
+            lines.append(f"   ❌ Error testing {description}: {e}")
+        return lines
+    
+    # The token is shared read-only across the worker threads
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for lines in executor.map(lambda t: probe(*t), auth_endpoints):
+            log.info("\n".join(lines))
 
 def test_frontend_accessibility():
     """Test frontend portal accessibility"""
-    print("\n🌐 FRONTEND ACCESSIBILITY TEST")
-    print("=" * 60)
+    log.info("\n🌐 FRONTEND ACCESSIBILITY TEST")
+    log.info("=" * 60)
     
     frontend_urls = [
         (f"{FRONTEND_URL}", "Main website"),
@@ -186,21 +244,29 @@ def test_frontend_accessibility():
         (f"{FRONTEND_URL}/admin", "Admin panel")
     ]
     
-    for url, description in frontend_urls:
+    def probe(url, description):
+        lines = [f"🧪 Testing {description}..."]
         try:
-            print(f"🧪 Testing {description}...")
-            response = requests.get(url, timeout=15)
+            with CLIENT.stream("GET", url, timeout=15) as response:
+                status = response.status_code
             
-            if response.status_code == 200:
-                print(f"   ✅ Accessible: {description}")
+            if status == 200:
+                lines.append(f"   ✅ Accessible: {description}")
             else:
-                print(f"   ⚠️ Status {response.status_code}: {description}")
+                lines.append(f"   ⚠️ Status {status}: {description}")
                 
         except Exception as e:
-            print(f"   ❌ Error: {description} - {e}")
+            lines.append(f"   ❌ Error: {description} - {e}")
+        return lines
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for lines in executor.map(lambda t: probe(*t), frontend_urls):
+            log.info("\n".join(lines))
 
-def generate_final_deployment_report(api_results, auth_token):
+def generate_final_deployment_report(api_results, auth_token, timestamp=None):
     """Generate final deployment status report"""
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     # Count working endpoints
     working_endpoints = sum(1 for result in api_results.values() if "✅" in result)
@@ -217,10 +283,11 @@ def generate_final_deployment_report(api_results, auth_token):
         overall_status = "❌ NOT FUNCTIONAL"
         status_emoji = "❌"
     
-    report = f"""
+    # Collected as parts and joined once rather than grown with +=
+    parts = [f"""
 {status_emoji} NEUROSCAN CUSTOMER PORTAL - FINAL DEPLOYMENT REPORT
 {'=' * 70}
-📅 Deployment Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+📅 Deployment Date: {timestamp}
 📊 Overall Status: {overall_status}
 
 🔗 LIVE URLS:
@@ -230,15 +297,12 @@ def generate_final_deployment_report(api_results, auth_token):
    📚 API Docs: {CLOUD_API_URL}/docs
 
 📈 API ENDPOINT STATUS:
-"""
-    
-    for endpoint, status in api_results.items():
-        report += f"   {status} {endpoint}\n"
-    
-    report += f"\n📊 Statistics: {working_endpoints}/{total_endpoints} endpoints functional\n"
+"""]
+    parts.extend(f"   {status} {endpoint}\n" for endpoint, status in api_results.items())
+    parts.append(f"\n📊 Statistics: {working_endpoints}/{total_endpoints} endpoints functional\n")
     
     if auth_token:
-        report += f"""
+        parts.append(f"""
 🔐 AUTHENTICATION STATUS: ✅ WORKING
    🧪 Test Credentials: testcustomer / password123
    🔑 Access Token: {auth_token[:30]}...
@@ -249,9 +313,9 @@ def generate_final_deployment_report(api_results, auth_token):
    ✅ Product Catalog
    ✅ Certificate Management
    ✅ Scan Log History
-"""
+""")
     else:
-        report += f"""
+        parts.append("""
 🔐 AUTHENTICATION STATUS: ❌ NOT WORKING
    ⚠️ Customer login endpoints available but authentication failing
    🔧 May require manual database intervention
@@ -260,9 +324,9 @@ def generate_final_deployment_report(api_results, auth_token):
    1. Check Render deployment logs
    2. Verify database schema migration
    3. Test with different credentials
-"""
+""")
     
-    report += f"""
+    parts.append(f"""
 {'=' * 70}
 🎉 DEPLOYMENT SUMMARY:
    Frontend: ✅ Deployed and accessible at Vercel
@@ -271,17 +335,18 @@ def generate_final_deployment_report(api_results, auth_token):
    
 🚀 Customer Portal is {'LIVE' if auth_token else 'PARTIALLY LIVE'}!
 {'=' * 70}
-"""
+""")
     
-    return report
+    return "".join(parts)
 
 def main():
     """Main deployment test execution"""
-    print("🚀 NEUROSCAN CUSTOMER PORTAL - FINAL DEPLOYMENT TEST")
+    print(_e("🚀 NEUROSCAN CUSTOMER PORTAL - FINAL DEPLOYMENT TEST"))
     print("=" * 70)
     print(f"Target API: {CLOUD_API_URL}")
     print(f"Target Frontend: {FRONTEND_URL}")
-    print(f"Test Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    test_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"Test Time: {test_time}")
     print("=" * 70)
     
     # Step 1: Wait for deployment
@@ -289,23 +354,29 @@ def main():
     
     # Step 2: Test API endpoints
     api_results = comprehensive_api_test()
+    LOG_BUFFER.flush()
     
     # Step 3: Test customer authentication
     auth_token = test_customer_authentication()
+    LOG_BUFFER.flush()
     
     # Step 4: Test frontend
     test_frontend_accessibility()
+    LOG_BUFFER.flush()
     
     # Step 5: Generate final report
-    final_report = generate_final_deployment_report(api_results, auth_token)
+    final_report = generate_final_deployment_report(api_results, auth_token, test_time)
     
-    print(final_report)
+    print(_e(final_report))
     
-    # Save report to file
-    with open("f:\\NeuroCompany\\NeuroScan\\FINAL_CUSTOMER_PORTAL_DEPLOYMENT_REPORT.md", "w") as f:
-        f.write(final_report)
+    # Save report next to this script; write a temp file and rename it so
+    # readers never see a half-written report
+    report_path = Path(__file__).parent / "FINAL_CUSTOMER_PORTAL_DEPLOYMENT_REPORT.md"
+    tmp_path = report_path.with_suffix(".md.tmp")
+    tmp_path.write_text(final_report, encoding="utf-8")
+    os.replace(tmp_path, report_path)
     
-    print("💾 Final report saved to: FINAL_CUSTOMER_PORTAL_DEPLOYMENT_REPORT.md")
+    print(_e("💾 Final report saved to: FINAL_CUSTOMER_PORTAL_DEPLOYMENT_REPORT.md"))
     
     return auth_token is not None
 
@@ -5,10 +5,13 @@ This script performs a comprehensive test of the Customer Portal
 to verify all improvements are working correctly.
 """
 
-import requests
+import base64
 import json
+import time
 from datetime import datetime
 
+from neuro_http import SESSION
+
 print("🔥 CUSTOMER PORTAL - FINAL VERIFICATION")
 print("=" * 50)
 print(f"📅 Test Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -22,6 +25,19 @@ TEST_CREDENTIALS = {
     "password": "password123"
 }
 
+# Customer token from the login test, reused until shortly before it expires
+_TOKEN_CACHE = {"token": None, "exp": 0}
+
+def cache_token(token):
+    """Remember a customer token together with its JWT expiry"""
+    try:
+        payload = token.split(".")[1]
+        exp = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"]
+    except (IndexError, KeyError, ValueError):
+        exp = 0
+    _TOKEN_CACHE["token"] = token
+    _TOKEN_CACHE["exp"] = exp
+
 def test_component(name, test_func):
     """Test a component and return result"""
     try:
@@ -35,7 +51,7 @@ def test_component(name, test_func):
 
 def test_api_health():
     """Test API health endpoint"""
-    response = requests.get(f"{API_BASE}/health", timeout=10)
+    response = SESSION.get(f"{API_BASE}/health", timeout=10)
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "healthy"
@@ -43,7 +59,7 @@ def test_api_health():
 
 def test_customer_login():
     """Test customer login functionality"""
-    response = requests.post(
+    response = SESSION.post(
         f"{API_BASE}/customer/login",
         data=TEST_CREDENTIALS,
         timeout=30  # Extended timeout for cold start
@@ -52,13 +68,18 @@ def test_customer_login():
     data = response.json()
     assert "access_token" in data
     assert data["customer"]["username"] == "testcustomer"
+    cache_token(data["access_token"])
     return data
 
 def test_protected_endpoints():
     """Test protected customer endpoints"""
-    # First login to get token
-    login_response = requests.post(f"{API_BASE}/customer/login", data=TEST_CREDENTIALS)
-    token = login_response.json()["access_token"]
+    # Reuse the login test's token; only log in again if it is missing or about to expire
+    if _TOKEN_CACHE["token"] and _TOKEN_CACHE["exp"] > time.time() + 5:
+        token = _TOKEN_CACHE["token"]
+    else:
+        login_response = SESSION.post(f"{API_BASE}/customer/login", data=TEST_CREDENTIALS)
+        token = login_response.json()["access_token"]
+        cache_token(token)
     headers = {"Authorization": f"Bearer {token}"}
     
     # Test protected endpoints
@@ -66,7 +87,7 @@ def test_protected_endpoints():
     results = {}
     
     for endpoint in endpoints:
-        response = requests.get(f"{API_BASE}{endpoint}", headers=headers, timeout=10)
+        response = SESSION.get(f"{API_BASE}{endpoint}", headers=headers, timeout=10)
         results[endpoint] = response.status_code
         assert response.status_code == 200
     
@@ -74,14 +95,31 @@ def test_protected_endpoints():
 
 def test_frontend_accessibility():
     """Test frontend accessibility"""
-    response = requests.get(FRONTEND_URL, timeout=10)
+    response = SESSION.get(FRONTEND_URL, timeout=10)
     assert response.status_code == 200
     return response.status_code
 
+# Preflight results keyed by URL: (lower-cased headers, expiry)
+_CORS_CACHE = {}
+
+def _cors_probe(url):
+    """OPTIONS url, reusing the answer for as long as Access-Control-Max-Age allows"""
+    cached = _CORS_CACHE.get(url)
+    if cached and cached[1] > time.time():
+        return cached[0]
+    
+    response = SESSION.options(url, timeout=10)
+    headers = {name.lower(): value for name, value in response.headers.items()}
+    try:
+        max_age = int(headers.get("access-control-max-age", 0))
+    except ValueError:
+        max_age = 0
+    _CORS_CACHE[url] = (headers, time.time() + max_age)
+    return headers
+
 def test_cors_configuration():
     """Test CORS configuration"""
-    response = requests.options(f"{API_BASE}/customer/login")
-    headers = dict(response.headers)
+    headers = _cors_probe(f"{API_BASE}/customer/login")
     assert "access-control-allow-origin" in headers
     assert FRONTEND_URL in headers["access-control-allow-origin"]
     return headers
@@ -5,28 +5,31 @@ This script directly adds customer authentication fields to the cloud database
 and creates a test customer for the customer portal.
 """
 
-import requests
 import json
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import cache
+import customer_suite
+import neuro_http
+
 # Configuration
-CLOUD_API_URL = "https://neuroscan-api.onrender.com"
+CLOUD_API_URL = neuro_http.API_BASE
 
 def test_api_connectivity():
     """Test basic API connectivity"""
     print("🔍 Testing API connectivity...")
     try:
-        response = requests.get(f"{CLOUD_API_URL}/health", timeout=30)
-        if response.status_code == 200:
-            health_data = response.json()
+        status, text = neuro_http.get_health()
+        if status == 200:
+            health_data = json.loads(text)
             print("✅ API is online and healthy")
             print(f"   Environment: {health_data.get('environment', 'unknown')}")
             print(f"   Database: {health_data.get('database', 'unknown')}")
             print(f"   Database Type: {health_data.get('database_type', 'unknown')}")
             return True
         else:
-            print(f"❌ API health check failed: {response.status_code}")
+            print(f"❌ API health check failed: {status}")
             return False
     except Exception as e:
         print(f"❌ API connectivity failed: {e}")
@@ -43,25 +46,21 @@ def check_customer_endpoints():
         ("/docs", "GET")
     ]
     
-    available_endpoints = []
+    # For POST endpoints, test with empty data to see if endpoint exists
+    responses = neuro_http.request_all(
+        [(method, endpoint, {"json": {}} if method == "POST" else {}) for endpoint, method in endpoints_to_test],
+        status_only=True
+    )
     
-    for endpoint, method in endpoints_to_test:
-        try:
-            if method == "GET":
-                response = requests.get(f"{CLOUD_API_URL}{endpoint}", timeout=10)
-            else:
-                # For POST endpoints, test with empty data to see if endpoint exists
-                response = requests.post(f"{CLOUD_API_URL}{endpoint}", 
-                                       json={}, timeout=10)
-            
-            if response.status_code != 404:
-                available_endpoints.append(endpoint)
-                print(f"✅ {method} {endpoint}: Available ({response.status_code})")
-            else:
-                print(f"❌ {method} {endpoint}: Not found (404)")
-                
-        except Exception as e:
-            print(f"❌ {method} {endpoint}: Error - {e}")
+    available_endpoints = []
+    for (endpoint, method), response in zip(endpoints_to_test, responses):
+        if isinstance(response, Exception):
+            print(f"❌ {method} {endpoint}: Error - {response}")
+        elif response.status_code != 404:
+            available_endpoints.append(endpoint)
+            print(f"✅ {method} {endpoint}: Available ({response.status_code})")
+        else:
+            print(f"❌ {method} {endpoint}: Not found (404)")
     
     return available_endpoints
 
@@ -83,75 +82,81 @@ def test_customer_registration():
         "password": "password123"
     }
     
-    for endpoint in registration_endpoints:
+    def register(endpoint):
+        """Try one registration endpoint; returns (registered, output line)"""
         try:
-            response = requests.post(
-                f"{CLOUD_API_URL}{endpoint}",
-                json=test_customer_data,
-                timeout=30
+            response = neuro_http.post(
+                endpoint,
+                json=test_customer_data
             )
             
-            if response.status_code in [200, 201]:
-                print(f"✅ Customer registered via {endpoint}")
-                return True
-            elif response.status_code == 409:
-                print(f"ℹ️ Customer already exists via {endpoint}")
-                return True
+            kind = neuro_http.classify(response.status_code)
+            if kind == "ok":
+                return True, f"✅ Customer registered via {endpoint}"
+            elif kind == "exists":
+                return True, f"ℹ️ Customer already exists via {endpoint}"
             else:
-                print(f"⚠️ {endpoint}: {response.status_code} - {response.text[:100]}")
+                return False, f"⚠️ {endpoint}: {response.status_code} - {response.text[:100]}"
                 
         except Exception as e:
-            print(f"❌ {endpoint}: Error - {e}")
+            return False, f"❌ {endpoint}: Error - {e}"
     
-    return False
+    # The route that worked last time is tried on its own first
+    candidates = registration_endpoints
+    cached = cache.last_endpoint("customer_register")
+    if cached in registration_endpoints:
+        registered, line = register(cached)
+        print(line)
+        if registered:
+            return True
+        candidates = [endpoint for endpoint in registration_endpoints if endpoint != cached]
+    
+    # At most one of these routes exists, so try them all at once
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        outcomes = list(executor.map(register, candidates))
+    
+    for endpoint, (registered, line) in zip(candidates, outcomes):
+        print(line)
+        if registered:
+            cache.remember_endpoint("customer_register", endpoint)
+    return any(registered for registered, _ in outcomes)
 
-def test_customer_login():
-    """Test customer login functionality"""
+def run_customer_checks():
+    """Log in as the test customer once and fetch the dashboard with that token"""
+    return customer_suite.run_customer_suite("testcustomer", "password123", ["/customer/dashboard"])
+
+def test_customer_login(suite):
+    """Report the customer login from a suite run; returns the token"""
     print("\n🔍 Testing customer login...")
     
-    login_data = {
-        "username": "testcustomer",
-        "password": "password123"
-    }
+    response = suite["login"]
+    if isinstance(response, Exception):
+        print(f"❌ Customer login error: {response}")
+        return None
     
-    try:
-        response = requests.post(
-            f"{CLOUD_API_URL}/customer/login",
-            json=login_data,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            print("✅ Customer login successful!")
-            token_data = response.json()
-            print(f"   Token: {token_data.get('access_token', 'N/A')[:50]}...")
-            return token_data.get('access_token')
-        else:
-            print(f"❌ Customer login failed: {response.status_code}")
-            print(f"   Response: {response.text[:200]}")
-            return None
-            
-    except Exception as e:
-        print(f"❌ Customer login error: {e}")
+    if response.status_code == 200:
+        print("✅ Customer login successful!")
+        print(f"   Token: {(suite['token'] or 'N/A')[:50]}...")
+        return suite["token"]
+    else:
+        print(f"❌ Customer login failed: {response.status_code}")
+        print(f"   Response: {response.text[:200]}")
         return None
 
-def test_customer_dashboard(token):
-    """Test customer dashboard with authentication token"""
-    if not token:
+def test_customer_dashboard(suite):
+    """Report the customer dashboard probe from a suite run"""
+    if not suite["token"]:
         print("⚠️ No token available for dashboard testing")
         return False
         
     print("\n🔍 Testing customer dashboard...")
     
-    headers = {"Authorization": f"Bearer {token}"}
+    response = suite["results"]["/customer/dashboard"]
+    if isinstance(response, Exception):
+        print(f"❌ Customer dashboard error: {response}")
+        return False
     
     try:
-        response = requests.get(
-            f"{CLOUD_API_URL}/customer/dashboard",
-            headers=headers,
-            timeout=30
-        )
-        
         if response.status_code == 200:
             print("✅ Customer dashboard accessible!")
             dashboard_data = response.json()
@@ -177,16 +182,39 @@ def force_database_migration():
         "/setup"
     ]
     
-    for endpoint in migration_endpoints:
+    def trigger(endpoint):
+        """POST one migration endpoint; returns its status, or None on error"""
         try:
-            response = requests.post(f"{CLOUD_API_URL}{endpoint}", timeout=60)
-            if response.status_code in [200, 201]:
-                print(f"✅ Migration triggered via {endpoint}")
-                return True
-            else:
-                print(f"⚠️ {endpoint}: {response.status_code}")
-        except:
-            pass
+            with neuro_http.post(endpoint, stream=True) as response:
+                return response.status_code
+        except Exception:
+            return None
+    
+    # The endpoint that worked last time is tried on its own first
+    candidates = migration_endpoints
+    cached = cache.last_endpoint("migrate")
+    if cached in migration_endpoints:
+        status = trigger(cached)
+        if neuro_http.classify(status) == "ok":
+            print(f"✅ Migration triggered via {cached}")
+            return True
+        elif status is not None:
+            print(f"⚠️ {cached}: {status}")
+        candidates = [endpoint for endpoint in migration_endpoints if endpoint != cached]
+    
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        statuses = list(executor.map(trigger, candidates))
+    
+    triggered = False
+    for endpoint, status in zip(candidates, statuses):
+        if neuro_http.classify(status) == "ok":
+            print(f"✅ Migration triggered via {endpoint}")
+            cache.remember_endpoint("migrate", endpoint)
+            triggered = True
+        elif status is not None:
+            print(f"⚠️ {endpoint}: {status}")
+    if triggered:
+        return True
     
     print("⚠️ No migration endpoints found")
     return False
@@ -199,6 +227,11 @@ def main():
     print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
     
+    # Nothing to fix if the portal already works end to end
+    if neuro_http.already_healthy("testcustomer", "password123"):
+        print("✅ Customer portal is already healthy - no fix needed")
+        return True
+    
     # Step 1: Test basic connectivity
     if not test_api_connectivity():
         print("❌ Cannot proceed - API is not accessible")
@@ -214,8 +247,8 @@ def main():
         print("\n🔧 Attempting to fix missing endpoints...")
         force_database_migration()
         
-        # Wait and recheck
-        time.sleep(10)
+        # Wait for the API to answer again, then recheck
+        neuro_http.wait_ready(max_wait=10)
         available_endpoints = check_customer_endpoints()
         
         if "/customer/login" not in available_endpoints:
@@ -226,11 +259,10 @@ def main():
     if not test_customer_registration():
         print("⚠️ Could not register test customer via API")
     
-    # Step 4: Test customer login
-    token = test_customer_login()
-    
-    # Step 5: Test customer dashboard
-    dashboard_success = test_customer_dashboard(token)
+    # Steps 4-5: Log in once, then test the customer dashboard with that token
+    suite = run_customer_checks()
+    token = test_customer_login(suite)
+    dashboard_success = test_customer_dashboard(suite)
     
     # Final status
     print("\n" + "=" * 60)
@@ -4,12 +4,52 @@ Direct Cloud Database Migration for Customer Authentication
 Fixes PostgreSQL schema to support customer login functionality
 """
 
-import requests
+import base64
 import json
 import time
 import os
+import subprocess
+from pathlib import Path
 
-API_BASE = "https://neuroscan-api.onrender.com"
+import cache
+import customer_suite
+import neuro_http
+from neuro_http import write_json
+
+API_BASE = neuro_http.API_BASE
+ADMIN_LOGIN_URL = f"{API_BASE}/auth/login"
+
+# Admin JWT and its expiry, shared by every admin-authenticated call in this run
+_TOKEN_CACHE = {"admin": None, "exp": 0}
+
+def admin_token(use_cache=True):
+    """Return an admin token, logging in only when no cached one is still valid"""
+    if use_cache:
+        if _TOKEN_CACHE["admin"] and time.time() < _TOKEN_CACHE["exp"] - 30:
+            return _TOKEN_CACHE["admin"]
+        token = cache.load_admin_token(ADMIN_LOGIN_URL)
+        if token:
+            _TOKEN_CACHE.update(admin=token, exp=time.time() + 60)
+            return token
+    
+    response = neuro_http.post(
+        "/auth/login",
+        json={"username": "admin", "password": "admin123"},
+        idempotent=True
+    )
+    if response.status_code != 200:
+        print(f"   ❌ Admin login failed: {response.text}")
+        return None
+    
+    token = response.json().get("access_token")
+    try:
+        payload = token.split(".")[1]
+        exp = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"]
+    except (AttributeError, IndexError, KeyError, ValueError):
+        exp = time.time() + 300
+    _TOKEN_CACHE.update(admin=token, exp=exp)
+    cache.save_admin_token(ADMIN_LOGIN_URL, token, ttl=max(0, exp - time.time()))
+    return token
 
 def create_admin_customer_directly():
     """Create admin user and then customer via SQL operations"""
@@ -19,13 +59,12 @@ def create_admin_customer_directly():
     # First ensure admin exists
     print("1️⃣ Creating admin user if needed...")
     try:
-        admin_create_response = requests.post(
-            f"{API_BASE}/auth/create-admin",
-            timeout=15
+        admin_create_response = neuro_http.post(
+            "/auth/create-admin"
         )
         print(f"   Admin creation status: {admin_create_response.status_code}")
         
-        if admin_create_response.status_code in [200, 400]:  # 400 if already exists
+        if neuro_http.classify(admin_create_response.status_code) in ("ok", "exists"):
             print("   ✅ Admin user available")
         
     except Exception as e:
@@ -34,14 +73,9 @@ def create_admin_customer_directly():
     # Now try to login as admin
     print("2️⃣ Logging in as admin...")
     try:
-        admin_login = requests.post(
-            f"{API_BASE}/auth/login",
-            json={"username": "admin", "password": "admin123"},
-            timeout=15
-        )
+        token = admin_token()
         
-        if admin_login.status_code == 200:
-            token = admin_login.json().get("access_token")
+        if token:
             print("   ✅ Admin login successful")
             
             # Now use admin to execute direct customer creation
@@ -55,29 +89,35 @@ def create_admin_customer_directly():
                 "is_active": True
             }
             
-            headers = {"Authorization": f"Bearer {token}"}
-            
             # Try to create customer
-            customer_response = requests.post(
-                f"{API_BASE}/admin/customers",
+            customer_response = neuro_http.post(
+                "/admin/customers",
                 json=customer_data,
-                headers=headers,
-                timeout=15
+                headers={"Authorization": f"Bearer {token}"}
             )
             
+            # A cached token may have been revoked; log in again once
+            if customer_response.status_code == 401:
+                cache.clear_admin_token(ADMIN_LOGIN_URL)
+                token = admin_token(use_cache=False)
+                if token:
+                    customer_response = neuro_http.post(
+                        "/admin/customers",
+                        json=customer_data,
+                        headers={"Authorization": f"Bearer {token}"}
+                    )
+            
             print(f"   Customer creation status: {customer_response.status_code}")
             
-            if customer_response.status_code in [200, 201]:
+            kind = neuro_http.classify(customer_response.status_code)
+            if kind == "ok":
                 print("   ✅ Customer created successfully!")
                 return True
-            elif customer_response.status_code == 400:
+            elif kind == "exists":
                 print("   ⚠️ Customer may already exist")
                 return True  # Consider this success
             else:
                 print(f"   ❌ Customer creation failed: {customer_response.text}")
-                
-        else:
-            print(f"   ❌ Admin login failed: {admin_login.text}")
             
     except Exception as e:
         print(f"   ❌ Error: {e}")
@@ -89,21 +129,21 @@ def force_database_schema_update():
     print("🔧 FORCING DATABASE SCHEMA UPDATE")
     print("="*60)
     
-    # Try to trigger database operations that would create missing columns
-    endpoints_to_stress = [
-        "/health",
-        "/docs",
-        "/admin/dashboard",
-        "/customer/me"
-    ]
-    
-    print("📡 Stressing endpoints to trigger schema updates...")
-    for endpoint in endpoints_to_stress:
-        try:
-            response = requests.get(f"{API_BASE}{endpoint}", timeout=5)
-            print(f"   {endpoint}: {response.status_code}")
-        except:
-            pass
+    # The schema migration runs on deploy, not on these requests, so stressing
+    # endpoints is opt-in (FORCE_STRESS=1) and done in one parallel pass
+    if os.environ.get("FORCE_STRESS"):
+        endpoints_to_stress = [
+            "/health",
+            "/docs",
+            "/admin/dashboard",
+            "/customer/me"
+        ]
+        
+        print("📡 Stressing endpoints to trigger schema updates...")
+        responses = neuro_http.request_all([("GET", endpoint, {}) for endpoint in endpoints_to_stress], status_only=True)
+        for endpoint, response in zip(endpoints_to_stress, responses):
+            if not isinstance(response, Exception):
+                print(f"   {endpoint}: {response.status_code}")
     
     # Create deployment trigger to force restart
     print("🚀 Creating deployment trigger...")
@@ -121,17 +161,20 @@ This deployment should trigger automatic database migration.
 """
     
     try:
-        with open("DATABASE_MIGRATION_TRIGGER.md", "w", encoding="utf-8") as f:
-            f.write(trigger_content)
+        repo_dir = Path(__file__).resolve().parent
+        (repo_dir / "DATABASE_MIGRATION_TRIGGER.md").write_text(trigger_content, encoding="utf-8")
         
-        # Git operations to trigger deployment
-        os.system("git add DATABASE_MIGRATION_TRIGGER.md")
-        os.system('git commit -m "Force: Customer portal database schema migration"')
-        os.system("git push origin main")
+        # Git operations to trigger deployment; run directly (no shell) and
+        # stop at the first failing step instead of pushing regardless
+        subprocess.run(["git", "add", "DATABASE_MIGRATION_TRIGGER.md"], check=True, cwd=repo_dir)
+        subprocess.run(["git", "commit", "-m", "Force: Customer portal database schema migration"], check=True, cwd=repo_dir)
+        subprocess.run(["git", "push", "origin", "main"], check=True, cwd=repo_dir)
         
         print("✅ Deployment trigger created and pushed")
         print("⏳ Waiting for Render to deploy...")
-        time.sleep(45)  # Wait for deployment
+        # The old deploy keeps answering /health until Render switches over,
+        # so give the build the original 45s before polling
+        neuro_http.wait_ready(max_wait=90, min_wait=45)
         
         return True
         
@@ -144,51 +187,52 @@ def test_customer_functionality():
     print("🧪 TESTING CUSTOMER FUNCTIONALITY")
     print("="*60)
     
+    # Customer endpoints to test once logged in
+    test_endpoints = [
+        ("/customer/me", "Profile"),
+        ("/customer/dashboard", "Dashboard"),
+        ("/customer/products", "Products"), 
+        ("/customer/certificates", "Certificates"),
+        ("/customer/scan-logs", "Scan Logs")
+    ]
+    names = dict(test_endpoints)
+    
     # Test customer login
     print("🔐 Testing customer login...")
     try:
-        login_response = requests.post(
-            f"{API_BASE}/customer/login",
-            json={"username": "testcustomer", "password": "testpass123"},
-            timeout=15
+        # One login, then every endpoint at once with that token; the verdict
+        # is all-or-nothing, so stop waiting at the first failure
+        suite = customer_suite.run_customer_suite(
+            "testcustomer", "testpass123", list(names), stop_on_failure=True
         )
+        login_response = suite["login"]
+        if isinstance(login_response, Exception):
+            raise login_response
         
         print(f"Login status: {login_response.status_code}")
+        kind = neuro_http.classify(login_response.status_code)
         
-        if login_response.status_code == 200:
+        if kind == "ok":
             print("✅ Customer login successful!")
-            token_data = login_response.json()
-            access_token = token_data.get("access_token")
             
-            if access_token:
-                headers = {"Authorization": f"Bearer {access_token}"}
-                
-                # Test customer endpoints
-                test_endpoints = [
-                    ("/customer/me", "Profile"),
-                    ("/customer/dashboard", "Dashboard"),
-                    ("/customer/products", "Products"), 
-                    ("/customer/certificates", "Certificates"),
-                    ("/customer/scan-logs", "Scan Logs")
-                ]
-                
+            if suite["token"]:
                 print("📊 Testing customer endpoints...")
                 all_working = True
                 
-                for endpoint, name in test_endpoints:
-                    try:
-                        response = requests.get(f"{API_BASE}{endpoint}", headers=headers, timeout=10)
-                        print(f"   {name}: {response.status_code}")
-                        
-                        if response.status_code != 200:
-                            all_working = False
-                            print(f"      ❌ {response.text[:100]}")
-                        else:
-                            print(f"      ✅ Working")
-                            
-                    except Exception as e:
-                        print(f"   {name}: ❌ Error - {e}")
+                for endpoint, response in suite["results"].items():
+                    name = names[endpoint]
+                    if isinstance(response, Exception):
+                        print(f"   {name}: ❌ Error - {response}")
                         all_working = False
+                        continue
+                    
+                    print(f"   {name}: {response.status_code}")
+                    
+                    if response.status_code != 200:
+                        all_working = False
+                        print(f"      ❌ {response.text[:100]}")
+                    else:
+                        print(f"      ✅ Working")
                 
                 if all_working:
                     print("🎉 ALL CUSTOMER ENDPOINTS WORKING!")
@@ -196,9 +240,9 @@ def test_customer_functionality():
                 else:
                     print("⚠️ Some customer endpoints have issues")
                     
-        elif login_response.status_code == 401:
+        elif kind == "auth":
             print("⚠️ Authentication failed - customer may not exist")
-        elif login_response.status_code == 500:
+        elif kind == "server":
             print("❌ Server error - database schema issue")
         else:
             print(f"❌ Login failed: {login_response.text}")
@@ -213,9 +257,6 @@ def create_comprehensive_test_report():
     print("📋 CREATING COMPREHENSIVE TEST REPORT")
     print("="*60)
     
-    # Test all endpoints
-    endpoints_status = {}
-    
     test_cases = [
         ("GET", "/health", "Health Check"),
         ("GET", "/docs", "API Documentation"),
@@ -226,20 +267,32 @@ def create_comprehensive_test_report():
         ("GET", "/verify/test", "Product Verification")
     ]
     
+    def payload(endpoint):
+        if "auth" in endpoint:
+            return {"username": "admin", "password": "admin123"}
+        return {"username": "testcustomer", "password": "testpass123"}
+    
+    # /health comes from the shared cache; everything else goes out at once
+    # over one client, and the report keeps test-case order
+    calls = [(method, endpoint, {"json": payload(endpoint)} if method == "POST" else {})
+             for method, endpoint, _ in test_cases if endpoint != "/health"]
+    # Only the status codes go into the report, so no body is downloaded
+    responses = iter(neuro_http.request_all(calls, status_only=True))
+    
+    endpoints_status = {}
     for method, endpoint, name in test_cases:
         try:
-            if method == "POST":
-                if "auth" in endpoint:
-                    data = {"username": "admin", "password": "admin123"}
-                else:
-                    data = {"username": "testcustomer", "password": "testpass123"}
-                response = requests.post(f"{API_BASE}{endpoint}", json=data, timeout=10)
+            if endpoint == "/health":
+                status, _ = neuro_http.get_health()
             else:
-                response = requests.get(f"{API_BASE}{endpoint}", timeout=10)
+                response = next(responses)
+                if isinstance(response, Exception):
+                    raise response
+                status = response.status_code
             
             endpoints_status[name] = {
-                "status": response.status_code,
-                "working": response.status_code in [200, 401, 422]
+                "status": status,
+                "working": neuro_http.classify(status) in ("ok", "auth", "bad")
             }
             
         except Exception as e:
@@ -260,8 +313,7 @@ def create_comprehensive_test_report():
     }
     
     # Save report
-    with open("customer_portal_test_results.json", "w") as f:
-        json.dump(report, f, indent=2)
+    write_json("customer_portal_test_results.json", report)
     
     print("✅ Test report saved to customer_portal_test_results.json")
     return report
@@ -274,6 +326,11 @@ def main():
     print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*70)
     
+    # Nothing to fix if the portal already works end to end
+    if neuro_http.already_healthy("testcustomer", "testpass123"):
+        print("✅ Customer portal is already healthy - no fix needed")
+        return True
+    
     # Step 1: Force schema update
     schema_updated = force_database_schema_update()
     
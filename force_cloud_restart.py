@@ -5,12 +5,12 @@ This script attempts to trigger a cloud database initialization by forcing a res
 or triggering database creation through the app startup process.
 """
 
-import requests
-import time
-import json
 from datetime import datetime
+from pathlib import Path
 
-CLOUD_API_URL = "https://neuroscan-api.onrender.com"
+import neuro_http
+
+CLOUD_API_URL = neuro_http.API_BASE
 
 def trigger_render_restart():
     """Trigger a restart of the Render service"""
@@ -31,23 +31,14 @@ def wait_for_service_restart(max_wait=300):
     """Wait for the service to restart and come back online"""
     print(f"\n⏳ Waiting for service restart (max {max_wait}s)...")
     
-    start_time = time.time()
-    
-    while time.time() - start_time < max_wait:
-        try:
-            response = requests.get(f"{CLOUD_API_URL}/health", timeout=10)
-            if response.status_code == 200:
-                health_data = response.json()
-                print(f"✅ Service is back online!")
-                print(f"   Environment: {health_data.get('environment')}")
-                print(f"   Database: {health_data.get('database')}")
-                return True
-        except:
-            pass
-        
-        elapsed = int(time.time() - start_time)
-        print(f"   ⏳ Waiting... ({elapsed}s elapsed)")
-        time.sleep(10)
+    if neuro_http.wait_ready(max_wait):
+        # wait_ready just cached this answer, so this does not hit the API again
+        _, text = neuro_http.get_health()
+        health_data = neuro_http.json_loads(text)
+        print("✅ Service is back online!")
+        print(f"   Environment: {health_data.get('environment')}")
+        print(f"   Database: {health_data.get('database')}")
+        return True
     
     print("❌ Service restart timeout")
     return False
@@ -65,21 +56,22 @@ def test_customer_functionality():
     
     try:
         print("🔍 Testing customer login...")
-        response = requests.post(
-            f"{CLOUD_API_URL}/customer/login",
+        response = neuro_http.post(
+            "/customer/login",
             json=login_data,
-            timeout=30
+            idempotent=True
         )
         
         print(f"   Status: {response.status_code}")
+        kind = neuro_http.classify(response.status_code)
         
-        if response.status_code == 200:
+        if kind == "ok":
             print("✅ Customer login successful!")
             return True
-        elif response.status_code == 422:
+        elif kind == "bad":
             print("⚠️ Validation error - endpoint is working but credentials invalid")
             return True
-        elif response.status_code == 404:
+        elif kind == "notfound":
             print("❌ Customer endpoints still not found")
             return False
         else:
@@ -104,8 +96,7 @@ Purpose: Force customer portal database initialization
 Status: Triggering cloud restart to initialize customer authentication
 """
     
-    with open("f:\\NeuroCompany\\NeuroScan\\DEPLOYMENT_TRIGGER.md", "w") as f:
-        f.write(deployment_marker)
+    Path(__file__).resolve().parent.joinpath("DEPLOYMENT_TRIGGER.md").write_text(deployment_marker, encoding="utf-8")
     
     print(f"✅ Created deployment marker: DEPLOYMENT_TRIGGER.md")
     return True
@@ -118,10 +109,8 @@ def main():
     print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 70)
     
-    # Step 1: Create deployment marker
-    force_commit_and_push()
-    
-    # Step 2: Test current functionality 
+    # Step 1: Test current functionality; one login probe decides whether
+    # any restart work is needed at all
     print("\n🔍 Testing current functionality...")
     current_working = test_customer_functionality()
     
@@ -130,6 +119,9 @@ def main():
         print("🎉 No restart needed - customer authentication is functional")
         return True
     
+    # Step 2: Create deployment marker, only now that a restart is needed
+    force_commit_and_push()
+    
     # Step 3: Trigger restart
     trigger_render_restart()
     
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP session for the cloud fix/restart scripts
+One keep-alive connection pool with retries, so chained scripts and repeated
+calls to the API reuse connections instead of paying DNS + TCP + TLS each time
+"""
+
+import asyncio
+import json
+import socket
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import cache
+
+API_BASE = "https://neuroscan-api.onrender.com"
+DEFAULT_TIMEOUT = 10
+HEALTH_TTL = 30
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+# orjson is optional; fall back to the stdlib codec when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def json_loads(data):
+    """Parse a JSON response body (bytes or str)"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def json_body(obj, indent=False):
+    """Serialize obj to JSON bytes, e.g. for a request body or a report file"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+def json_dumps(obj, indent=None):
+    """Serialize obj to a JSON string, e.g. for printing"""
+    return json_body(obj, indent=bool(indent)).decode()
+
+def write_json(path, obj):
+    """Write obj to path as indented JSON in a single buffered write"""
+    with open(path, "wb") as f:
+        f.write(json_body(obj, indent=True))
+
+# Timeout policy by path: quick probes fail fast, auth calls allow for the
+# server-side password hashing, migrations get the longest budget
+TIMEOUTS = {
+    "/health": 5,
+    "/docs": 5,
+    "/auth/login": 15,
+    "/auth/create-admin": 15,
+    "/customer/login": 15,
+    "/customer/register": 15,
+    "/auth/customer/register": 15,
+    "/api/v1/customer/register": 15,
+    "/admin/customers": 15,
+    "/admin/migrate": 30,
+    "/api/v1/migrate": 30,
+    "/migrate": 30,
+    "/setup": 30,
+}
+
+# Status code -> outcome class, so call sites branch on one lookup
+STATUS_CLASS = {
+    200: "ok",
+    201: "ok",
+    204: "ok",
+    400: "exists",
+    401: "auth",
+    404: "notfound",
+    409: "exists",
+    422: "bad",
+    500: "server",
+    502: "down",
+    503: "down",
+    504: "down",
+}
+
+# Render cold starts answer 429/5xx for a while: the test scripts retry those
+# with exponential backoff (1s, 2s, 4s). Only GET/HEAD are retried on status,
+# since a create that failed with a 5xx may already have been committed.
+# 4xx such as 401/403/422 fail fast, and the last response is returned rather
+# than raised, so the tests still report it
+COLD_START_RETRY = Retry(
+    total=3,
+    backoff_factor=1.0,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET", "HEAD"],
+    raise_on_status=False
+)
+# (connect, read): fail fast on connect, give a waking instance up to 120s to answer
+COLD_START_TIMEOUT = (5, 120)
+
+def cold_start_session():
+    """New keep-alive session that retries Render cold-start errors per COLD_START_RETRY"""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=COLD_START_RETRY))
+    return session
+
+def classify(status):
+    """Outcome class for a status code, per STATUS_CLASS ("unknown" otherwise)"""
+    return STATUS_CLASS.get(status, "unknown")
+
+def timeout_for(path):
+    """Timeout for a request to path, per TIMEOUTS"""
+    return TIMEOUTS.get(path, DEFAULT_TIMEOUT)
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose sockets disable Nagle and enable TCP keepalive
+
+    Keepalive probes stop idle pooled connections from being dropped while a
+    script waits on a slow Render cold start or migration
+    """
+
+    SOCKET_OPTIONS = [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+def _retrying_adapter(methods):
+    """Keep-alive adapter that retries gateway errors (Render cold start) for methods
+
+    The last response is returned rather than raised, so callers still see it
+    """
+    return _KeepAliveAdapter(
+        pool_connections=2,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=methods,
+            raise_on_status=False
+        )
+    )
+
+# Shared HTTP session so connections are kept alive across requests. Only
+# GET/HEAD/OPTIONS are replayed after a 502/504: a POST (registration, /auth/create-admin,
+# migrations) may already have been applied upstream. The scripts'
+# candidate-endpoint lists only deal with 404s
+SESSION = requests.Session()
+SESSION.mount("https://", _retrying_adapter(["GET", "HEAD", "OPTIONS"]))
+
+# Separate pool for POSTs the caller declared idempotent (post(..., idempotent=True)),
+# such as logins, which are safe to replay
+IDEMPOTENT_SESSION = requests.Session()
+IDEMPOTENT_SESSION.mount("https://", _retrying_adapter(["GET", "HEAD", "OPTIONS", "POST"]))
+
+# Pool without retries for wait_ready: it runs its own backoff loop, and a
+# retried probe would run past the caller's deadline
+PROBE_SESSION = requests.Session()
+PROBE_SESSION.mount("https://", _KeepAliveAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+
+def get(path, **kwargs):
+    """GET API_BASE + path through the shared session"""
+    return SESSION.get(API_BASE + path, timeout=kwargs.pop("timeout", timeout_for(path)), **kwargs)
+
+def post(path, idempotent=False, **kwargs):
+    """POST to API_BASE + path through the shared session
+
+    Gateway errors are only retried when the caller passes idempotent=True.
+    """
+    session = IDEMPOTENT_SESSION if idempotent else SESSION
+    return session.post(API_BASE + path, timeout=kwargs.pop("timeout", timeout_for(path)), **kwargs)
+
+def request_all(calls, status_only=False):
+    """Send (method, path, kwargs) calls concurrently and return the responses in order
+
+    All calls share one httpx.AsyncClient, so with HTTP/2 they are multiplexed
+    over a single TLS connection. Each call gets its path's timeout_for()
+    unless kwargs sets one. A failed call yields its exception instead of a response.
+    With status_only the responses are closed unread, so no body is transferred.
+    """
+    async def send(client, method, path, kwargs):
+        request = client.build_request(method, path, **{"timeout": timeout_for(path), **kwargs})
+        response = await client.send(request, stream=status_only)
+        if status_only:
+            await response.aclose()
+        return response
+    
+    async def run():
+        async with httpx.AsyncClient(base_url=API_BASE, http2=HTTP2_ENABLED, timeout=DEFAULT_TIMEOUT,
+                                     follow_redirects=True) as client:
+            return await asyncio.gather(
+                *(send(client, method, path, kwargs) for method, path, kwargs in calls),
+                return_exceptions=True
+            )
+    return asyncio.run(run())
+
+def get_health(force=False, timeout=None, session=None):
+    """Return (status, text) for /health, reusing a healthy answer for HEALTH_TTL seconds
+
+    The answer goes through the on-disk cache, so chained scripts share it too.
+    Pollers waiting for a restart pass force=True to always hit the API.
+    session defaults to the retrying SESSION.
+    """
+    url = API_BASE + "/health"
+    if not force:
+        hit = cache.lookup(url)
+        if hit is not None:
+            return hit
+    
+    response = (session or SESSION).get(url, timeout=timeout or timeout_for("/health"))
+    if response.ok:
+        cache.store(url, response.status_code, response.text, HEALTH_TTL)
+    return response.status_code, response.text
+
+def already_healthy(username, password):
+    """True when /health is up and the given customer can already log in
+
+    One cheap probe pair that lets the fix scripts skip their remediation work.
+    """
+    try:
+        status, _ = get_health()
+        if status != 200:
+            return False
+        return post("/customer/login", json={"username": username, "password": password},
+                    idempotent=True, timeout=5).status_code == 200
+    except Exception:
+        return False
+
+def wait_ready(max_wait=60, min_wait=0, require_db=False):
+    """Poll /health with exponential backoff (0.5s, 1s, 2s, ... capped at 8s)
+
+    Returns True as soon as the API answers 200 (with require_db, only once it
+    also reports itself healthy with a connected database), False once
+    max_wait has passed.
+    Polling starts after min_wait seconds: right after a push the old deploy is
+    still answering /health, and /health carries nothing that tells the two
+    deploys apart, so callers waiting for a redeploy pass a minimum wait.
+    Each probe goes through PROBE_SESSION with at most 3 seconds (and never
+    more than the time left), so the deadline holds.
+    """
+    deadline = time.time() + max_wait
+    if min_wait:
+        time.sleep(min(min_wait, max_wait))
+    delay = 0.5
+    
+    while time.time() < deadline:
+        try:
+            remaining = deadline - time.time()
+            status, text = get_health(force=True, timeout=max(0.1, min(3, remaining)),
+                                      session=PROBE_SESSION)
+            if status == 200:
+                if not require_db:
+                    return True
+                data = json_loads(text)
+                if data.get("status") == "healthy" and data.get("database") == "connected":
+                    return True
+        except Exception:
+            pass
+        time.sleep(min(delay, max(0, deadline - time.time())))
+        delay = min(delay * 2, 8)
+    
+    return False
+
+class AdminToken:
+    """Admin bearer token for one login URL, shared on disk with other runs (see cache.py)
+
+    request() sends through the caller's session with the token attached. When
+    the API answers 401 (a revoked token, or one signed with an old key) the
+    cached token is forgotten, the admin logs in again and the request is sent
+    once more. A failed login raises RuntimeError.
+    """
+    
+    def __init__(self, session, login_url, login_body, timeout=COLD_START_TIMEOUT):
+        self.session = session
+        self.login_url = login_url
+        self.login_body = login_body
+        self.timeout = timeout
+        self._token = None
+    
+    def get(self, refresh=False):
+        """Return the token, logging in only when no cached one is valid (or on refresh)"""
+        if refresh:
+            self._token = None
+            cache.clear_admin_token(self.login_url)
+        elif self._token is None:
+            self._token = cache.load_admin_token(self.login_url)
+        if self._token is None:
+            response = self.session.post(self.login_url, data=self.login_body,
+                                         headers=JSON_HEADERS, timeout=self.timeout)
+            if response.status_code != 200:
+                raise RuntimeError(f"Login failed: {response.status_code} {response.text}")
+            token = json_loads(response.content).get("access_token")
+            if not token:
+                raise RuntimeError("No access token received")
+            self._token = token
+            cache.save_admin_token(self.login_url, token)
+        return self._token
+    
+    def request(self, method, url, headers=None, **kwargs):
+        """Send an authenticated request, logging in again once if the token is rejected"""
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.request(method, url, headers={**(headers or {}), "Authorization": f"Bearer {self.get()}"},
+                                        **kwargs)
+        if response.status_code == 401:
+            response.close()
+            token = self.get(refresh=True)
+            response = self.session.request(method, url, headers={**(headers or {}), "Authorization": f"Bearer {token}"},
+                                            **kwargs)
+        return response
@@ -3,10 +3,15 @@
 Quick test of customer authentication
 """
 
-import requests
 import json
+import os
 
-API_URL = "https://neuroscan-api.onrender.com"
+import neuro_http
+
+API_URL = neuro_http.API_BASE
+
+# Response bodies are only printed with NEUROSCAN_VERBOSE=1
+VERBOSE = os.environ.get("NEUROSCAN_VERBOSE", "0") == "1"
 
 def test_customer_login():
     """Test customer login functionality"""
@@ -14,8 +19,9 @@ def test_customer_login():
     
     try:        # Test health first
         print("Testing health endpoint...")
-        health_response = requests.get(f"{API_URL}/health", timeout=10)
-        print(f"✅ Health check: {health_response.status_code}")
+        # Shares the on-disk health answer with the other cloud scripts
+        health_status, _ = neuro_http.get_health()
+        print(f"✅ Health check: {health_status}")
         
         # Test customer login
         login_data = {
@@ -24,14 +30,15 @@ def test_customer_login():
         }
         
         print("🧪 Attempting customer login...")
-        response = requests.post(
-            f"{API_URL}/customer/login",
+        response = neuro_http.post(
+            "/customer/login",
             json=login_data,
-            timeout=15
+            idempotent=True
         )
         
         print(f"📊 Login Status: {response.status_code}")
-        print(f"📄 Response: {response.text}")
+        if VERBOSE:
+            print(f"📄 Response: {response.text}")
         
         if response.status_code == 200:
             data = response.json()
@@ -41,7 +48,7 @@ def test_customer_login():
             return True
         else:
             print(f"❌ Login failed: {response.status_code}")
-            if response.text:
+            if VERBOSE and response.text:
                 try:
                     error_data = response.json()
                     print(f"📄 Error details: {error_data}")
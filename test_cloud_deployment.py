@@ -5,38 +5,60 @@ NeuroScan Cloud Deployment Test Suite
 Comprehensive testing of the deployed cloud system
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import logging
+import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urljoin
+
+from neuro_http import HTTP2_ENABLED, json_loads, write_json
 
 # Cloud URLs
 BACKEND_URL = "https://neuroscan-api.onrender.com"
 FRONTEND_URL = "https://neuroscan-system.vercel.app"
 
+# Test output goes through logging so messages are only formatted when emitted
+log = logging.getLogger("neuroscan.test")
+log.setLevel(logging.INFO)
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+log.addHandler(_handler)
+
 class NeuroScanCloudTester:
     def __init__(self):
         self.backend_url = BACKEND_URL
+        # Full backend URLs, built once
+        self.urls = {path: urljoin(self.backend_url, path) for path in ("/", "/health", "/docs")}
         self.frontend_url = FRONTEND_URL
+        # (test, status, details, seconds since start) tuples; turned into dicts
+        # with absolute timestamps for the report
         self.test_results = []
+        self._t0 = time.monotonic()
+        self._epoch = datetime.now()
+        # In-flight or finished GETs by backend path, shared by the tests of one run
+        self._fetches = {}
+        
+    def fetch(self, client, path):
+        """GET a backend path at most once per run; concurrent callers share the request"""
+        if path not in self._fetches:
+            self._fetches[path] = asyncio.ensure_future(client.get(self.urls[path]))
+        return self._fetches[path]
         
     def log_test(self, test_name, status, details=""):
         """Log test results"""
-        result = {
-            "test": test_name,
-            "status": "✅ PASS" if status else "❌ FAIL",
-            "details": details,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.test_results.append(result)
-        print(f"{result['status']} {test_name}: {details}")
+        status = "✅ PASS" if status else "❌ FAIL"
+        self.test_results.append((test_name, status, details, time.monotonic() - self._t0))
+        log.info("%s %s: %s", status, test_name, details)
         
-    def test_backend_health(self):
+    async def test_backend_health(self, client):
         """Test backend health endpoint"""
         try:
-            response = requests.get(f"{self.backend_url}/health", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
+            response = await self.fetch(client, "/health")
+            status = response.status_code
+            data = json_loads(response.content) if status == 200 else None
+            if status == 200:
                 if data.get("status") == "healthy" and data.get("database") == "connected":
                     self.log_test("Backend Health Check", True, 
                                 f"Database: {data.get('database_type', 'Unknown')}")
@@ -47,32 +69,31 @@ class NeuroScanCloudTester:
                     return False
             else:
                 self.log_test("Backend Health Check", False, 
-                            f"HTTP {response.status_code}")
+                            f"HTTP {status}")
                 return False
         except Exception as e:
             self.log_test("Backend Health Check", False, f"Connection error: {e}")
             return False
             
-    def test_api_documentation(self):
+    async def test_api_documentation(self, client):
         """Test API documentation endpoint"""
         try:
-            response = requests.get(f"{self.backend_url}/docs", timeout=10)
-            if response.status_code == 200:
+            status = (await self.fetch(client, "/docs")).status_code
+            if status == 200:
                 self.log_test("API Documentation", True, "Swagger docs accessible")
                 return True
             else:
-                self.log_test("API Documentation", False, f"HTTP {response.status_code}")
+                self.log_test("API Documentation", False, f"HTTP {status}")
                 return False
         except Exception as e:
             self.log_test("API Documentation", False, f"Error: {e}")
             return False
             
-    def test_cors_headers(self):
+    async def test_cors_headers(self, client):
         """Test CORS configuration"""
         try:
-            response = requests.options(f"{self.backend_url}/health", 
-                                      headers={"Origin": self.frontend_url},
-                                      timeout=10)
+            response = await client.options(self.urls["/health"], 
+                                            headers={"Origin": self.frontend_url})
             cors_headers = response.headers.get("Access-Control-Allow-Origin")
             if cors_headers:
                 self.log_test("CORS Configuration", True, f"CORS headers present")
@@ -84,21 +105,23 @@ class NeuroScanCloudTester:
             self.log_test("CORS Configuration", False, f"Error: {e}")
             return False
             
-    def test_frontend_accessibility(self):
+    async def test_frontend_accessibility(self, client):
         """Test frontend accessibility"""
         try:
-            response = requests.get(self.frontend_url, timeout=10)
-            if response.status_code == 200:
+            # Only the status matters, so skip downloading the page
+            response = await client.head(self.frontend_url)
+            status = response.status_code
+            if status == 200:
                 self.log_test("Frontend Accessibility", True, "Frontend loads successfully")
                 return True
             else:
-                self.log_test("Frontend Accessibility", False, f"HTTP {response.status_code}")
+                self.log_test("Frontend Accessibility", False, f"HTTP {status}")
                 return False
         except Exception as e:
             self.log_test("Frontend Accessibility", False, f"Error: {e}")
             return False
             
-    def test_api_endpoints(self):
+    async def test_api_endpoints(self, client):
         """Test key API endpoints"""
         endpoints = [
             ("/", "Root endpoint"),
@@ -106,23 +129,29 @@ class NeuroScanCloudTester:
             ("/docs", "API documentation"),
         ]
         
-        for endpoint, description in endpoints:
-            try:
-                response = requests.get(f"{self.backend_url}{endpoint}", timeout=10)
-                if response.status_code == 200:
-                    self.log_test(f"API Endpoint {endpoint}", True, description)
-                else:
-                    self.log_test(f"API Endpoint {endpoint}", False, 
-                                f"HTTP {response.status_code}")
-            except Exception as e:
-                self.log_test(f"API Endpoint {endpoint}", False, f"Error: {e}")
+        # Fetch all endpoints at once, then log them in list order; /health and
+        # /docs reuse the requests made by the other tests
+        responses = await asyncio.gather(
+            *(self.fetch(client, endpoint) for endpoint, _ in endpoints),
+            return_exceptions=True
+        )
+        
+        for (endpoint, description), response in zip(endpoints, responses):
+            if isinstance(response, Exception):
+                self.log_test(f"API Endpoint {endpoint}", False, f"Error: {response}")
+            elif response.status_code == 200:
+                self.log_test(f"API Endpoint {endpoint}", True, description)
+            else:
+                self.log_test(f"API Endpoint {endpoint}", False, 
+                            f"HTTP {response.status_code}")
                 
-    def test_database_connection(self):
+    async def test_database_connection(self, client):
         """Test database connection through health endpoint"""
         try:
-            response = requests.get(f"{self.backend_url}/health", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
+            response = await self.fetch(client, "/health")
+            status = response.status_code
+            data = json_loads(response.content) if status == 200 else None
+            if status == 200:
                 db_status = data.get("database")
                 db_type = data.get("database_type", "Unknown")
                 
@@ -135,20 +164,21 @@ class NeuroScanCloudTester:
                                 f"Status: {db_status}, Type: {db_type}")
                     return False
             else:
-                self.log_test("PostgreSQL Database", False, f"HTTP {response.status_code}")
+                self.log_test("PostgreSQL Database", False, f"HTTP {status}")
                 return False
         except Exception as e:
             self.log_test("PostgreSQL Database", False, f"Error: {e}")
             return False
             
-    def test_response_times(self):
+    async def test_response_times(self, client):
         """Test response times"""
         start_time = time.time()
         try:
-            response = requests.get(f"{self.backend_url}/health", timeout=10)
+            response = await client.get(self.urls["/health"])
+            status = response.status_code
             response_time = (time.time() - start_time) * 1000  # Convert to ms
             
-            if response.status_code == 200 and response_time < 5000:  # 5 seconds
+            if status == 200 and response_time < 5000:  # 5 seconds
                 self.log_test("Response Time", True, 
                             f"{response_time:.0f}ms (Good performance)")
                 return True
@@ -160,10 +190,21 @@ class NeuroScanCloudTester:
             self.log_test("Response Time", False, f"Error: {e}")
             return False
             
+    async def run_tests(self, tests):
+        """Run the given tests concurrently over one shared client
+        
+        With HTTP/2 the requests to each host are multiplexed over a single connection.
+        """
+        limits = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+        async with httpx.AsyncClient(http2=HTTP2_ENABLED, timeout=10.0, limits=limits,
+                                     follow_redirects=True) as client:
+            self._fetches = {}
+            return await asyncio.gather(*(test(client) for test in tests), return_exceptions=True)
+        
     def run_all_tests(self):
         """Run comprehensive test suite"""
-        print("🧪 Starting NeuroScan Cloud Deployment Tests...")
-        print("=" * 60)
+        log.info("🧪 Starting NeuroScan Cloud Deployment Tests...")
+        log.info("=" * 60)
         
         # Run all tests
         tests = [
@@ -176,25 +217,23 @@ class NeuroScanCloudTester:
             self.test_response_times,
         ]
         
-        passed_tests = 0
-        total_tests = len(tests)
+        # The tests are independent, so they all run at once
+        results = asyncio.run(self.run_tests(tests))
         
-        for test in tests:
-            if test():
-                passed_tests += 1
-            time.sleep(1)  # Brief pause between tests
+        passed_tests = sum(1 for result in results if result is True)
+        total_tests = len(tests)
             
-        print("\n" + "=" * 60)
-        print(f"🎯 Test Results: {passed_tests}/{total_tests} tests passed")
+        log.info("\n%s", "=" * 60)
+        log.info("🎯 Test Results: %d/%d tests passed", passed_tests, total_tests)
         
         if passed_tests == total_tests:
-            print("🎉 ALL TESTS PASSED! Your cloud deployment is working perfectly!")
+            log.info("🎉 ALL TESTS PASSED! Your cloud deployment is working perfectly!")
             status = "SUCCESS"
         elif passed_tests >= total_tests * 0.8:  # 80% pass rate
-            print("⚠️  Most tests passed. Minor issues detected.")
+            log.info("⚠️  Most tests passed. Minor issues detected.")
             status = "MOSTLY_SUCCESS"
         else:
-            print("❌ Several tests failed. Please check the issues.")
+            log.info("❌ Several tests failed. Please check the issues.")
             status = "ISSUES_DETECTED"
             
         # Generate test report
@@ -212,26 +251,29 @@ class NeuroScanCloudTester:
             "tests_passed": passed,
             "tests_total": total,
             "success_rate": f"{(passed/total)*100:.1f}%",
-            "test_results": self.test_results
+            "test_results": [
+                {"test": test, "status": outcome, "details": details,
+                 "timestamp": (self._epoch + timedelta(seconds=elapsed)).isoformat()}
+                for test, outcome, details, elapsed in self.test_results
+            ]
         }
         
         # Save report to file
-        with open("cloud_deployment_test_report.json", "w") as f:
-            json.dump(report, f, indent=2)
+        write_json("cloud_deployment_test_report.json", report)
             
-        print(f"\n📋 Detailed test report saved to: cloud_deployment_test_report.json")
+        log.info("\n📋 Detailed test report saved to: %s", "cloud_deployment_test_report.json")
 
 
 if __name__ == "__main__":
     tester = NeuroScanCloudTester()
     status, passed, total = tester.run_all_tests()
     
-    print(f"\n🏆 Final Status: {status}")
-    print(f"📊 Success Rate: {(passed/total)*100:.1f}%")
+    log.info("\n🏆 Final Status: %s", status)
+    log.info("📊 Success Rate: %.1f%%", passed / total * 100)
     
     if status == "SUCCESS":
-        print("\n🚀 Your NeuroScan system is fully operational in the cloud!")
-        print("🌐 URLs:")
-        print(f"   Frontend: {FRONTEND_URL}")
-        print(f"   Backend API: {BACKEND_URL}")
-        print(f"   API Docs: {BACKEND_URL}/docs")
+        log.info("\n🚀 Your NeuroScan system is fully operational in the cloud!")
+        log.info("🌐 URLs:")
+        log.info("   Frontend: %s", FRONTEND_URL)
+        log.info("   Backend API: %s", BACKEND_URL)
+        log.info("   API Docs: %s/docs", BACKEND_URL)
@@ -3,30 +3,45 @@
 Test Cloud API Endpoints Availability
 """
 
-import requests
-import json
+import httpx
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+
+from neuro_http import HTTP2_ENABLED, JSON_HEADERS, json_body
+
+# Response bodies are only printed with NEUROSCAN_VERBOSE=1
+VERBOSE = os.environ.get("NEUROSCAN_VERBOSE", "0") == "1"
 
 CLOUD_API_URL = "https://neuroscan-api.onrender.com"
+CUSTOMER_LOGIN_URL = urljoin(CLOUD_API_URL, "/customer/login")
 
-def test_endpoint(endpoint, method="GET", data=None):
-    """Test if an endpoint is available"""
+# Shared HTTP client; with HTTP/2 the concurrent probes are multiplexed over
+# one connection. Failed connects are retried by the transport
+CLIENT = httpx.Client(
+    http2=HTTP2_ENABLED,
+    timeout=10.0,
+    transport=httpx.HTTPTransport(
+        http2=HTTP2_ENABLED,
+        retries=2,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=16)
+    ),
+    follow_redirects=True
+)
+
+def test_endpoint(endpoint, method="GET", data=None, url=None):
+    """Test if an endpoint is available; returns (available, output line)"""
     try:
-        url = f"{CLOUD_API_URL}{endpoint}"
-        
-        if method == "GET":
-            response = requests.get(url, timeout=10)
-        elif method == "POST":
-            response = requests.post(url, json=data, timeout=10)
+        url = url or urljoin(CLOUD_API_URL, endpoint)
+        kwargs = {"content": json_body(data), "headers": JSON_HEADERS} if method == "POST" else {}
+        # Only the status is needed, so the body is never downloaded
+        with CLIENT.stream(method, url, **kwargs) as response:
+            status = response.status_code
         
-        print(f"  {method} {endpoint}: {response.status_code}")
-        
-        if response.status_code not in [404, 405]:
-            return True
-        return False
+        return status not in [404, 405], f"  {method} {endpoint}: {status}"
         
     except Exception as e:
-        print(f"  {method} {endpoint}: ERROR - {e}")
-        return False
+        return False, f"  {method} {endpoint}: ERROR - {e}"
 
 def main():
     print("🔍 TESTING CLOUD API ENDPOINTS")
@@ -51,10 +66,24 @@ def main():
         ("/api/v1/verify", "GET"),
     ]
     
-    available_endpoints = []
+    # Full URLs, built once per endpoint
+    urls = {endpoint: urljoin(CLOUD_API_URL, endpoint) for endpoint, _ in endpoints_to_test}
     
+    # Probe all endpoints at once; output is still printed in list order
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(test_endpoint, endpoint, method, {"test": "data"}, urls[endpoint]): (method, endpoint)
+            for endpoint, method in endpoints_to_test
+        }
+        for future in as_completed(futures):
+            outcomes[futures[future]] = future.result()
+    
+    available_endpoints = []
     for endpoint, method in endpoints_to_test:
-        if test_endpoint(endpoint, method, {"test": "data"}):
+        available, line = outcomes[(method, endpoint)]
+        print(line)
+        if available:
             available_endpoints.append(f"{method} {endpoint}")
     
     print("\n✅ Available endpoints:")
@@ -66,12 +95,13 @@ def main():
     # Test specific customer login
     print("\n🧪 Testing customer login specifically...")
     try:
-        response = requests.post(f"{CLOUD_API_URL}/customer/login", 
-                               json={"username": "test", "password": "test"},
-                               timeout=10)
-        print(f"Customer login response: {response.status_code}")
-        if response.status_code != 404:
-            print(f"Response body: {response.text[:200]}...")
+        with CLIENT.stream("POST", CUSTOMER_LOGIN_URL,
+                           content=json_body({"username": "test", "password": "test"}),
+                           headers=JSON_HEADERS) as response:
+            print(f"Customer login response: {response.status_code}")
+            # The body is only downloaded when it is going to be shown
+            if VERBOSE and response.status_code != 404:
+                print(f"Response body: {response.read().decode(errors='replace')[:200]}...")
     except Exception as e:
         print(f"Customer login test error: {e}")
 
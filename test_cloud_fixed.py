@@ -3,89 +3,98 @@
 Test script to verify cloud-based product creation with new fields (SKU, Price)
 """
 
-import requests
-import json
 import sys
 
+import neuro_http
+from neuro_http import JSON_HEADERS, json_body, json_loads
+
 # Cloud API endpoints
 BASE_URL = "https://neuroscan-api.onrender.com"
 LOGIN_URL = f"{BASE_URL}/auth/login"
 CUSTOMERS_URL = f"{BASE_URL}/admin/customers/"
 PRODUCTS_URL = f"{BASE_URL}/admin/products/"
 
+CUSTOMER_DATA = {
+    "name": "Test Customer",
+    "email": "test@example.com",
+    "phone": "+1234567890",
+    "address": "123 Test Street"
+}
+
+# Constant payloads are serialized once, at import
+LOGIN_BODY = json_body({"username": "admin", "password": "admin123"})
+CUSTOMER_BODY = json_body(CUSTOMER_DATA)
+
+TIMEOUT = neuro_http.COLD_START_TIMEOUT
+
+# Shared HTTP session so connections are kept alive across requests
+SESSION = neuro_http.cold_start_session()
+
+# Admin token, fetched on first use and reused by every test in the run; it is
+# shared on disk with the other test scripts and renewed if the API rejects it
+ADMIN = neuro_http.AdminToken(SESSION, LOGIN_URL, LOGIN_BODY, TIMEOUT)
+
+def _get_token():
+    """Log in as admin on first use and return the token (None on failure)"""
+    try:
+        return ADMIN.get()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return None
+
 def test_cloud_product_creation():
-    print("🚀 Testing cloud-based NeuroScan product creation...")
+    # Output is collected and written in one go when the test finishes
+    log = []
+    try:
+        return _test_cloud_product_creation(log)
+    finally:
+        print("\n".join(log))
+
+def _test_cloud_product_creation(log):
+    log.append("🚀 Testing cloud-based NeuroScan product creation...")
     
     # Step 1: Login to get access token
-    print("\n1. Logging in to get access token...")
-    login_data = {
-        "username": "admin",
-        "password": "admin123"
-    }
-    
+    log.append("\n1. Logging in to get access token...")
     try:
-        login_response = requests.post(LOGIN_URL, json=login_data)
-        print(f"Login response status: {login_response.status_code}")
-        
-        if login_response.status_code != 200:
-            print(f"❌ Login failed: {login_response.text}")
-            return False
-            
-        token_data = login_response.json()
-        access_token = token_data.get("access_token")
-        
-        if not access_token:
-            print("❌ No access token received")
+        if not _get_token():
             return False
             
-        print("✅ Login successful, token received")
+        log.append("✅ Login successful, token received")
         
     except Exception as e:
-        print(f"❌ Login error: {e}")
+        log.append(f"❌ Login error: {e}")
         return False
-      # Step 2: Create headers with authentication
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
     
     # Step 2.5: Create a test customer first
-    print("\n2. Creating test customer...")
-    customer_data = {
-        "name": "Test Customer",
-        "email": "test@example.com",
-        "phone": "+1234567890",
-        "address": "123 Test Street"
-    }
-    
+    log.append("\n2. Creating test customer...")
     try:
-        customer_response = requests.post(CUSTOMERS_URL, json=customer_data, headers=headers)
-        print(f"Customer creation response status: {customer_response.status_code}")
+        customer_response = ADMIN.request("POST", CUSTOMERS_URL, data=CUSTOMER_BODY, headers=JSON_HEADERS)
+        log.append(f"Customer creation response status: {customer_response.status_code}")
         
         if customer_response.status_code == 201:
-            created_customer = customer_response.json()
+            created_customer = json_loads(customer_response.content)
             customer_id = created_customer.get("id")
-            print(f"✅ Customer created successfully with ID: {customer_id}")
+            log.append(f"✅ Customer created successfully with ID: {customer_id}")
         else:
-            print(f"❌ Customer creation failed: {customer_response.text}")
+            log.append(f"❌ Customer creation failed: {customer_response.text}")
             # Try to get existing customers
-            get_customers_response = requests.get(CUSTOMERS_URL, headers=headers)
+            get_customers_response = ADMIN.request("GET", CUSTOMERS_URL)
             if get_customers_response.status_code == 200:
-                customers = get_customers_response.json()
+                customers = json_loads(get_customers_response.content)
                 if customers:
                     customer_id = customers[0].get("id")
-                    print(f"✅ Using existing customer with ID: {customer_id}")
+                    log.append(f"✅ Using existing customer with ID: {customer_id}")
                 else:
-                    print("❌ No customers available")
+                    log.append("❌ No customers available")
                     return False
             else:
                 return False
     except Exception as e:
-        print(f"❌ Customer creation error: {e}")
+        log.append(f"❌ Customer creation error: {e}")
         return False
     
     # Step 3: Test product creation with new fields
-    print("\n3. Creating test product with new fields...")
+    log.append("\n3. Creating test product with new fields...")
     product_data = {
         "customer_id": customer_id,
         "name": "Cloud Test Product",
@@ -96,61 +105,47 @@ def test_cloud_product_creation():
     }
     
     try:
-        create_response = requests.post(PRODUCTS_URL, json=product_data, headers=headers)
-        print(f"Create response status: {create_response.status_code}")
-        print(f"Create response: {create_response.text}")
-        if create_response.status_code == 201 or create_response.status_code == 200:
-            created_product = create_response.json()
+        create_response = ADMIN.request("POST", PRODUCTS_URL, data=json_body(product_data), headers=JSON_HEADERS)
+        log.append(f"Create response status: {create_response.status_code}")
+        log.append(f"Create response: {create_response.text}")
+        if create_response.status_code in (200, 201):
+            created_product = json_loads(create_response.content)
             product_id = created_product.get("id")
-            print(f"✅ Product created successfully with ID: {product_id}")
-            print(f"   - Name: {created_product.get('name')}")
-            print(f"   - SKU: {created_product.get('sku')}")
-            print(f"   - Price: {created_product.get('price')}")
-            print(f"   - Category: {created_product.get('category')}")
+            log.append(f"✅ Product created successfully with ID: {product_id}")
+            log.append(f"   - Name: {created_product.get('name')}")
+            log.append(f"   - SKU: {created_product.get('sku')}")
+            log.append(f"   - Price: {created_product.get('price')}")
+            log.append(f"   - Category: {created_product.get('category')}")
             
             # Check if new fields are missing
             if created_product.get('sku') is None or created_product.get('price') is None:
-                print("⚠️  WARNING: SKU or Price fields are missing from the response!")
-                print("⚠️  This indicates the backend schema needs to be updated.")
+                log.append("⚠️  WARNING: SKU or Price fields are missing from the response!")
+                log.append("⚠️  This indicates the backend schema needs to be updated.")
             
             return True
         else:
-            print(f"❌ Product creation failed: {create_response.text}")
+            log.append(f"❌ Product creation failed: {create_response.text}")
             return False
             
     except Exception as e:
-        print(f"❌ Product creation error: {e}")
+        log.append(f"❌ Product creation error: {e}")
         return False
 
 def test_cloud_product_retrieval():
     print("\n4. Testing product retrieval...")
     
-    # Login first
-    login_data = {
-        "username": "admin", 
-        "password": "admin123"
-    }
-    
     try:
-        login_response = requests.post(LOGIN_URL, json=login_data)
-        if login_response.status_code != 200:
+        # Reuses the token from the creation test when there is one
+        if not _get_token():
             print("❌ Login failed for product retrieval test")
             return False
-            
-        token_data = login_response.json()
-        access_token = token_data.get("access_token")
-        
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
         
         # Get all products
-        get_response = requests.get(PRODUCTS_URL, headers=headers)
+        get_response = ADMIN.request("GET", PRODUCTS_URL)
         print(f"Get products response status: {get_response.status_code}")
         
         if get_response.status_code == 200:
-            products = get_response.json()
+            products = json_loads(get_response.content)
             print(f"✅ Retrieved {len(products)} products")
             
             # Show details of products with new fields
@@ -175,6 +170,7 @@ if __name__ == "__main__":
     
     # Test product retrieval
     retrieval_success = test_cloud_product_retrieval()
+    SESSION.close()
     
     print("\n" + "=" * 60)
     if creation_success and retrieval_success:
@@ -3,37 +3,43 @@
 Test script to verify cloud-based product creation with new fields (SKU, Price)
 """
 
-import requests
-import json
 import sys
 
+import neuro_http
+from neuro_http import JSON_HEADERS, json_body, json_loads
+
 # Cloud API endpoints
 BASE_URL = "https://neuroscan-api.onrender.com"
 LOGIN_URL = f"{BASE_URL}/auth/login"
 PRODUCTS_URL = f"{BASE_URL}/admin/products/"
 
+# Serialized once, at import
+LOGIN_BODY = json_body({"username": "admin", "password": "admin123"})
+
+TIMEOUT = neuro_http.COLD_START_TIMEOUT
+
+# Shared HTTP session so connections are kept alive across requests
+SESSION = neuro_http.cold_start_session()
+
+# Admin token, fetched on first use and reused by every test in the run; it is
+# shared on disk with the other test scripts and renewed if the API rejects it
+ADMIN = neuro_http.AdminToken(SESSION, LOGIN_URL, LOGIN_BODY, TIMEOUT)
+
+def _get_token():
+    """Log in as admin on first use and return the token (None on failure)"""
+    try:
+        return ADMIN.get()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return None
+
 def test_cloud_product_creation():
     print("🚀 Testing cloud-based NeuroScan product creation...")
     
     # Step 1: Login to get access token
     print("\n1. Logging in to get access token...")
-    login_data = {
-        "username": "admin",
-        "password": "admin123"
-    }
     try:
-        login_response = requests.post(LOGIN_URL, json=login_data)
-        print(f"Login response status: {login_response.status_code}")
-        
-        if login_response.status_code != 200:
-            print(f"❌ Login failed: {login_response.text}")
-            return False
-            
-        token_data = login_response.json()
-        access_token = token_data.get("access_token")
-        
-        if not access_token:
-            print("❌ No access token received")
+        if not _get_token():
             return False
             
         print("✅ Login successful, token received")
@@ -42,12 +48,6 @@ def test_cloud_product_creation():
         print(f"❌ Login error: {e}")
         return False
     
-    # Step 2: Create headers with authentication
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    
     # Step 3: Test product creation with new fields
     print("\n2. Creating test product with new fields...")
     product_data = {
@@ -60,12 +60,12 @@ def test_cloud_product_creation():
     }
     
     try:
-        create_response = requests.post(PRODUCTS_URL, json=product_data, headers=headers)
+        create_response = ADMIN.request("POST", PRODUCTS_URL, data=json_body(product_data), headers=JSON_HEADERS)
         print(f"Create response status: {create_response.status_code}")
         print(f"Create response: {create_response.text}")
         
-        if create_response.status_code == 201:
-            created_product = create_response.json()
+        if create_response.status_code in (200, 201):
+            created_product = json_loads(create_response.content)
             product_id = created_product.get("id")
             print(f"✅ Product created successfully with ID: {product_id}")
             print(f"   - Name: {created_product.get('name')}")
@@ -84,32 +84,18 @@ def test_cloud_product_creation():
 def test_cloud_product_retrieval():
     print("\n3. Testing product retrieval...")
     
-    # Login first
-    login_data = {
-        "username": "admin", 
-        "password": "admin123"
-    }
-    
     try:
-        login_response = requests.post(LOGIN_URL, json=login_data)
-        if login_response.status_code != 200:
+        # Reuses the token from the creation test when there is one
+        if not _get_token():
             print("❌ Login failed for product retrieval test")
             return False
-            
-        token_data = login_response.json()
-        access_token = token_data.get("access_token")
-        
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
         
         # Get all products
-        get_response = requests.get(PRODUCTS_URL, headers=headers)
+        get_response = ADMIN.request("GET", PRODUCTS_URL)
         print(f"Get products response status: {get_response.status_code}")
         
         if get_response.status_code == 200:
-            products = get_response.json()
+            products = json_loads(get_response.content)
             print(f"✅ Retrieved {len(products)} products")
             
             # Show details of products with new fields
@@ -134,6 +120,7 @@ if __name__ == "__main__":
     
     # Test product retrieval
     retrieval_success = test_cloud_product_retrieval()
+    SESSION.close()
     
     print("\n" + "=" * 60)
     if creation_success and retrieval_success:
@@ -4,8 +4,21 @@
 Quick Frontend-Backend Integration Test
 """
 
-import requests
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import neuro_http
+from neuro_http import json_loads
+
+TIMEOUT = neuro_http.COLD_START_TIMEOUT
+
+# Shared HTTP session so connections are kept alive across requests
+SESSION = neuro_http.cold_start_session()
+
+# Frontend status -> report line; anything else is printed as a plain warning
+FRONTEND_STATUS = {
+    200: "✅ Frontend: Accessible",
+    404: "❌ Frontend: 404 Not Found\n   This could indicate Vercel deployment issues",
+}
 
 def test_integration():
     """Test frontend-backend integration"""
@@ -13,13 +26,35 @@ def test_integration():
     print("🔗 Testing Frontend-Backend Integration...")
     print("=" * 50)
     
+    # The three probes are independent, so they all run at once; results are
+    # still reported in the order below. The frontend page is streamed, so
+    # only the first few hundred bytes are read from it
+    probes = [
+        ("backend", "https://neuroscan-api.onrender.com/health", None, False),
+        ("frontend", "https://neuroscan-system.vercel.app", None, True),
+        ("cors", "https://neuroscan-api.onrender.com/health", {"Origin": "https://neuroscan-system.vercel.app"}, False),
+    ]
+    results = {}
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = {
+            executor.submit(SESSION.get, url, headers=headers, timeout=TIMEOUT, stream=stream): label
+            for label, url, headers, stream in probes
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+    
     # Test Backend Health
     try:
-        backend_response = requests.get("https://neuroscan-api.onrender.com/health", timeout=10)
+        backend_response = results["backend"]
+        if isinstance(backend_response, Exception):
+            raise backend_response
         print(f"✅ Backend Status: {backend_response.status_code}")
         
         if backend_response.status_code == 200:
-            data = backend_response.json()
+            data = json_loads(backend_response.content)
             print(f"   Database: {data.get('database')}")
             print(f"   Environment: {data.get('environment')}")
             print(f"   API Version: {data.get('api_version')}")
@@ -30,24 +65,23 @@ def test_integration():
     
     # Test Frontend
     try:
-        frontend_response = requests.get("https://neuroscan-system.vercel.app", timeout=10)
-        print(f"Frontend Status: {frontend_response.status_code}")
+        frontend_response = results["frontend"]
+        if isinstance(frontend_response, Exception):
+            raise frontend_response
+        with frontend_response:
+            status = frontend_response.status_code
+            content = next(frontend_response.iter_content(256), b"") if status == 200 else b""
+        print(f"Frontend Status: {status}")
         
-        if frontend_response.status_code == 200:
-            print("✅ Frontend: Accessible")
-            
-            # Check if it's a proper HTML response
-            content = frontend_response.text
-            if "<html" in content.lower():
+        print(FRONTEND_STATUS.get(status, f"⚠️  Frontend: HTTP {status}"))
+        
+        if status == 200:
+            # Check if it's a proper HTML response; the opening tag is in the
+            # first few hundred bytes read above
+            if b"<html" in content.lower():
                 print("✅ Valid HTML response")
             else:
                 print("⚠️  Non-HTML response")
-                
-        elif frontend_response.status_code == 404:
-            print("❌ Frontend: 404 Not Found")
-            print("   This could indicate Vercel deployment issues")
-        else:
-            print(f"⚠️  Frontend: HTTP {frontend_response.status_code}")
             
     except Exception as e:
         print(f"❌ Frontend Error: {e}")
@@ -56,11 +90,9 @@ def test_integration():
     
     # Test CORS specifically for the production URLs
     try:
-        cors_response = requests.get(
-            "https://neuroscan-api.onrender.com/health",
-            headers={"Origin": "https://neuroscan-system.vercel.app"},
-            timeout=10
-        )
+        cors_response = results["cors"]
+        if isinstance(cors_response, Exception):
+            raise cors_response
         
         cors_header = cors_response.headers.get("Access-Control-Allow-Origin")
         if cors_header:
@@ -3,88 +3,98 @@
 Test script to verify cloud-based product creation with new fields (SKU, Price)
 """
 
-import requests
 import json
 import sys
 
+import neuro_http
+from neuro_http import JSON_HEADERS, json_body, json_loads
+
 # Cloud API endpoints
 BASE_URL = "https://neuroscan-api.onrender.com"
 LOGIN_URL = f"{BASE_URL}/auth/login"
 CUSTOMERS_URL = f"{BASE_URL}/admin/customers/"
 PRODUCTS_URL = f"{BASE_URL}/admin/products/"
 
+CUSTOMER_DATA = {
+    "name": "SKU Test Customer",
+    "email": "skutest@example.com",
+    "phone": "+1234567890",
+    "address": "456 SKU Test Street"
+}
+
+# Serialized once, at import
+LOGIN_BODY = json_body({"username": "admin", "password": "admin123"})
+CUSTOMER_BODY = json_body(CUSTOMER_DATA)
+
+TIMEOUT = neuro_http.COLD_START_TIMEOUT
+
+# Shared HTTP session so connections are kept alive across requests
+SESSION = neuro_http.cold_start_session()
+
+# Admin token, fetched on first use and reused by every test in the run; it is
+# shared on disk with the other test scripts and renewed if the API rejects it
+ADMIN = neuro_http.AdminToken(SESSION, LOGIN_URL, LOGIN_BODY, TIMEOUT)
+
 def get_auth_headers():
-    """Get authentication headers by logging in"""
-    login_data = {
-        "username": "admin",
-        "password": "admin123"
-    }
-    
+    """Log in (once per run) and return the authentication headers"""
     try:
-        login_response = requests.post(LOGIN_URL, json=login_data)
-        if login_response.status_code != 200:
-            print(f"❌ Login failed: {login_response.text}")
-            return None
-            
-        token_data = login_response.json()
-        access_token = token_data.get("access_token")
-        
-        if not access_token:
-            print("❌ No access token received")
-            return None
-            
-        return {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
+        access_token = ADMIN.get()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return None
     except Exception as e:
         print(f"❌ Login error: {e}")
         return None
+    
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }
 
 def test_product_creation_with_sku_price():
-    print("🚀 Testing cloud product creation with SKU and Price fields...")
+    # Output is collected and written in one go when the test finishes
+    log = []
+    try:
+        return _test_product_creation_with_sku_price(log)
+    finally:
+        print("\n".join(log))
+
+def _test_product_creation_with_sku_price(log):
+    log.append("🚀 Testing cloud product creation with SKU and Price fields...")
     
     # Get auth headers
     headers = get_auth_headers()
     if not headers:
         return False
     
-    print("✅ Authentication successful")
+    log.append("✅ Authentication successful")
     
     # Create a customer first
-    print("\n📋 Creating test customer...")
-    customer_data = {
-        "name": "SKU Test Customer",
-        "email": "skutest@example.com",
-        "phone": "+1234567890",
-        "address": "456 SKU Test Street"
-    }
-    
-    customer_response = requests.post(CUSTOMERS_URL, json=customer_data, headers=headers)
-    print(f"Customer creation status: {customer_response.status_code}")
+    log.append("\n📋 Creating test customer...")
+    customer_response = ADMIN.request("POST", CUSTOMERS_URL, data=CUSTOMER_BODY, headers=JSON_HEADERS)
+    log.append(f"Customer creation status: {customer_response.status_code}")
     
     if customer_response.status_code in [200, 201]:
-        customer = customer_response.json()
+        customer = json_loads(customer_response.content)
         customer_id = customer.get("id")
-        print(f"✅ Customer created/found with ID: {customer_id}")
+        log.append(f"✅ Customer created/found with ID: {customer_id}")
     else:
         # Try to get existing customers
-        get_response = requests.get(CUSTOMERS_URL, headers=headers)
+        get_response = ADMIN.request("GET", CUSTOMERS_URL)
         if get_response.status_code == 200:
-            customers = get_response.json()
+            customers = json_loads(get_response.content)
             if customers:
                 customer_id = customers[0].get("id")
-                print(f"✅ Using existing customer with ID: {customer_id}")
+                log.append(f"✅ Using existing customer with ID: {customer_id}")
             else:
-                print("❌ No customers available")
+                log.append("❌ No customers available")
                 return False
         else:
-            print("❌ Could not get customers")
+            log.append("❌ Could not get customers")
             return False
     
     # Test product creation with ALL fields including SKU and Price
-    print("\n🛍️ Creating product with SKU and Price...")
+    log.append("\n🛍️ Creating product with SKU and Price...")
     product_data = {
         "customer_id": customer_id,
         "name": "SKU Price Test Product",
@@ -94,53 +104,61 @@ def test_product_creation_with_sku_price():
         "price": "199.99"
     }
     
-    print(f"Sending product data: {json.dumps(product_data, indent=2)}")
+    log.append(f"Sending product data: {json.dumps(product_data, indent=2)}")
     
-    product_response = requests.post(PRODUCTS_URL, json=product_data, headers=headers)
-    print(f"Product creation status: {product_response.status_code}")
-    print(f"Product response: {product_response.text}")
+    product_response = ADMIN.request("POST", PRODUCTS_URL, data=json_body(product_data), headers=JSON_HEADERS)
+    log.append(f"Product creation status: {product_response.status_code}")
+    log.append(f"Product response: {product_response.text}")
     
     if product_response.status_code in [200, 201]:
-        product = product_response.json()
-        print(f"✅ Product created with ID: {product.get('id')}")
-        print(f"   📝 Name: {product.get('name')}")
-        print(f"   🏷️ SKU: {product.get('sku', 'MISSING!')}")
-        print(f"   💰 Price: {product.get('price', 'MISSING!')}")
-        print(f"   📂 Category: {product.get('category', 'MISSING!')}")
+        product = json_loads(product_response.content)
+        log.append(f"✅ Product created with ID: {product.get('id')}")
+        log.append(f"   📝 Name: {product.get('name')}")
+        log.append(f"   🏷️ SKU: {product.get('sku', 'MISSING!')}")
+        log.append(f"   💰 Price: {product.get('price', 'MISSING!')}")
+        log.append(f"   📂 Category: {product.get('category', 'MISSING!')}")
         
         # Check if new fields are properly saved
         if product.get('sku') and product.get('price'):
-            print("✅ SKU and Price fields are working correctly!")
+            log.append("✅ SKU and Price fields are working correctly!")
             return True
         else:
-            print("⚠️  WARNING: SKU or Price fields are missing!")
-            print("⚠️  Backend schema may need updates")
+            log.append("⚠️  WARNING: SKU or Price fields are missing!")
+            log.append("⚠️  Backend schema may need updates")
             return False
     else:
-        print(f"❌ Product creation failed: {product_response.text}")
+        log.append(f"❌ Product creation failed: {product_response.text}")
         return False
 
 def test_product_retrieval():
-    print("\n📥 Testing product retrieval with new fields...")
+    # Output is collected and written in one go when the test finishes
+    log = []
+    try:
+        return _test_product_retrieval(log)
+    finally:
+        print("\n".join(log))
+
+def _test_product_retrieval(log):
+    log.append("\n📥 Testing product retrieval with new fields...")
     
     headers = get_auth_headers()
     if not headers:
         return False
     
     # Get all products
-    response = requests.get(PRODUCTS_URL, headers=headers)
-    print(f"Product retrieval status: {response.status_code}")
+    response = ADMIN.request("GET", PRODUCTS_URL)
+    log.append(f"Product retrieval status: {response.status_code}")
     
     if response.status_code == 200:
-        products = response.json()
-        print(f"✅ Retrieved {len(products)} products")
+        products = json_loads(response.content)
+        log.append(f"✅ Retrieved {len(products)} products")
         
         for i, product in enumerate(products, 1):
-            print(f"   {i}. {product.get('name')} | SKU: {product.get('sku', 'None')} | Price: {product.get('price', 'None')}")
+            log.append(f"   {i}. {product.get('name')} | SKU: {product.get('sku', 'None')} | Price: {product.get('price', 'None')}")
         
         return True
     else:
-        print(f"❌ Product retrieval failed: {response.text}")
+        log.append(f"❌ Product retrieval failed: {response.text}")
         return False
 
 if __name__ == "__main__":
@@ -153,6 +171,7 @@ if __name__ == "__main__":
     
     # Test product retrieval
     retrieval_success = test_product_retrieval()
+    SESSION.close()
     
     print("\n" + "=" * 70)
     if creation_success and retrieval_success: